@@ -0,0 +1,123 @@
+"""Consultas de agendamentos para as telas de administração e histórico."""
+import codecs
+import datetime
+import re
+import tempfile
+
+from disponibilidade import invalidar_data
+from repositorio import obter_repositorio
+
+TAMANHO_PAGINA_ADMIN = 50
+TAMANHO_PAGINA_HISTORICO = 20
+LIMITE_BUSCA_CANCELAR = 20
+
+# Exportação: até aqui em memória, acima disso o arquivo temporário vai para o disco
+EXPORTACAO_EM_MEMORIA = 8 * 1024 * 1024
+
+# Campos de busca da aba Cancelar
+CAMPOS_BUSCA = ["Placa", "Nome", "Telefone", "Data"]
+
+
+def listar_agendamentos_admin(inicio, fim, servico=None, placa=None, apos=None, limite=TAMANHO_PAGINA_ADMIN):
+    """Uma página de agendamentos confirmados, paginada por (data, hora, id).
+
+    `apos` é a chave (data, hora, id) da última linha da página anterior.
+    Retorna (DataFrame, chave da próxima página ou None, erro).
+    """
+    if placa:
+        placa = placa.strip().upper()
+    df, erro = obter_repositorio().listar_agendamentos_admin(inicio, fim, servico, placa, apos, limite + 1)
+
+    if erro:
+        return None, None, erro
+
+    # Uma linha a mais só para saber se existe próxima página
+    proxima = None
+    if len(df) > limite:
+        df = df.iloc[:limite]
+        ultima = df.iloc[-1]
+        proxima = (ultima['data_agendamento'], ultima['hora_agendamento'], int(ultima['id']))
+    return df, proxima, None
+
+
+def exportar_agendamentos(inicio, fim, servico=None, placa=None, excel=False):
+    """CSV de todos os confirmados do período com os filtros da lista, sem paginar.
+
+    `excel` usa ponto e vírgula e BOM, como o Excel em português espera.
+    Retorna (arquivo binário posicionado no início, erro).
+    """
+    if placa:
+        placa = placa.strip().upper()
+    destino = tempfile.SpooledTemporaryFile(max_size=EXPORTACAO_EM_MEMORIA)
+    if excel:
+        destino.write(codecs.BOM_UTF8)
+    _, erro = obter_repositorio().exportar_agendamentos(inicio, fim, servico, placa, destino, ";" if excel else ",")
+
+    if erro:
+        destino.close()
+        return None, erro
+    destino.seek(0)
+    return destino, None
+
+
+def historico_usuario(usuario_id, apos=None, limite=TAMANHO_PAGINA_HISTORICO):
+    """Uma página do histórico do usuário, mais recentes primeiro.
+
+    `apos` é a chave (data, hora, id) da última linha já exibida.
+    Retorna (linhas, chave da próxima página ou None, erro).
+    """
+    linhas, erro = obter_repositorio().historico_usuario(usuario_id, apos, limite + 1)
+
+    if erro:
+        return [], None, erro
+
+    proxima = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proxima = (ultima['data_agendamento'], ultima['hora_agendamento'], ultima['id'])
+    return linhas, proxima, None
+
+
+def _ler_data(texto):
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y"):
+        try:
+            return datetime.datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    return None
+
+
+def buscar_agendamentos_confirmados(campo, termo, limite=LIMITE_BUSCA_CANCELAR):
+    """Até `limite` agendamentos confirmados que casam com o termo (lista, erro)"""
+    termo = termo.strip()
+    if campo == "Placa":
+        valor = termo.upper()
+    elif campo == "Nome":
+        if len(termo) < 3:
+            return [], "Digite ao menos 3 letras do nome"
+        valor = termo
+    elif campo == "Telefone":
+        valor = re.sub(r"\D", "", termo)
+        if len(valor) < 4:
+            return [], "Digite ao menos 4 dígitos do telefone"
+    elif campo == "Data":
+        valor = _ler_data(termo)
+        if valor is None:
+            return [], "Data inválida (use DD/MM/AAAA)"
+    else:
+        return [], f"Campo de busca desconhecido: {campo}"
+
+    return obter_repositorio().buscar_agendamentos_confirmados(campo, valor, limite)
+
+
+def cancelar_agendamento(agendamento_id):
+    """Cancela pelo id; retorna (True se cancelou, erro)"""
+    cancelado, erro = obter_repositorio().cancelar_agendamento(agendamento_id)
+
+    if erro:
+        return False, erro
+
+    for linha in cancelado:
+        invalidar_data(linha['data_agendamento'])
+    return bool(cancelado), None
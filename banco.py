@@ -0,0 +1,611 @@
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+from psycopg2.extras import RealDictCursor
+import streamlit as st
+
+from metricas import Metricas, exportar_periodicamente
+
+logger = logging.getLogger("capitalpneus.sql")
+
+# Erros que podem indicar conexão perdida (Neon suspenso, pooler reiniciado,
+# rede); quais de fato indicam, decide falha_de_conexao
+ERROS_CONEXAO = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# nome -> Declaracao: o catálogo das instruções fixas do app
+CATALOGO = {}
+
+_MARCADORES = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+# Lista da thread atual dentro de capturar_consultas()
+_captura = threading.local()
+
+
+def falha_de_conexao(erro, conn=None):
+    """Se `erro` é conexão perdida, e não uma resposta normal do servidor.
+
+    OperationalError também cobre statement_timeout, deadlock, falha de
+    serialização e lock_timeout: o banco respondeu, a conexão serve, e
+    repetir só soma outro timeout. Conexão perdida é erro sem SQLSTATE
+    (nunca chegou ao servidor), da classe 08 ou com a conexão fechada.
+    """
+    if conn is not None and conn.closed:
+        return True
+    if isinstance(erro, psycopg2.InterfaceError):
+        return True
+    if isinstance(erro, psycopg2.OperationalError):
+        return erro.pgcode is None or erro.pgcode.startswith("08")
+    return False
+
+
+class PoolEsgotado(psycopg2.pool.PoolError):
+    """Nenhuma conexão livre dentro do tempo de espera"""
+
+
+class BancoIndisponivel(Exception):
+    """Recusada sem tocar no banco: o disjuntor está aberto"""
+
+
+class Disjuntor:
+    """Circuit breaker das conexões: fechado, aberto ou meio-aberto.
+
+    Depois de `limite_falhas` falhas de conexão seguidas o circuito abre e
+    toda chamada é recusada na hora, sem segurar a thread do Streamlit em
+    timeouts. Passados `espera` segundos, uma única chamada testa o banco
+    (meio-aberto): se funcionar o circuito fecha, se falhar abre de novo.
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio-aberto"
+
+    def __init__(self, limite_falhas, espera):
+        self.limite_falhas = limite_falhas
+        self.espera = espera
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self.aberturas = 0
+        self.recusadas = 0
+        self._reabrir_em = 0.0
+        self._testando = False
+        self._trava = threading.Lock()
+
+    def permitir(self):
+        """Levanta BancoIndisponivel se a chamada não deve chegar ao banco"""
+        with self._trava:
+            if self.estado == self.FECHADO:
+                return
+            agora = time.monotonic()
+            if self.estado == self.ABERTO and agora >= self._reabrir_em:
+                self.estado = self.MEIO_ABERTO
+            if self.estado == self.MEIO_ABERTO and not self._testando:
+                self._testando = True
+                return
+            self.recusadas += 1
+            restante = max(self._reabrir_em - agora, 0)
+        raise BancoIndisponivel(f"Banco de dados indisponível (nova tentativa em {restante:.0f}s)")
+
+    def sucesso(self):
+        with self._trava:
+            self.falhas_seguidas = 0
+            self.estado = self.FECHADO
+            self._testando = False
+
+    def sem_veredito(self):
+        """A chamada não chegou ao banco (pool esgotado): libera o teste do meio-aberto"""
+        with self._trava:
+            self._testando = False
+
+    def falha(self):
+        with self._trava:
+            self.falhas_seguidas += 1
+            if self.estado == self.MEIO_ABERTO or self.falhas_seguidas >= self.limite_falhas:
+                if self.estado != self.ABERTO:
+                    self.aberturas += 1
+                self.estado = self.ABERTO
+                self._reabrir_em = time.monotonic() + self.espera
+                self._testando = False
+
+
+def obter_config(nome, padrao=None):
+    """Lê configuração das variáveis de ambiente ou do st.secrets"""
+    valor = os.environ.get(nome)
+    if valor is not None:
+        return valor
+    try:
+        return st.secrets.get(nome, padrao)
+    except Exception:
+        return padrao
+
+
+def parametros_conexao():
+    """Parâmetros de conexão com o Neon"""
+    return dict(
+        host=obter_config("NEON_HOST", "ep-wispy-smoke-ac9dimqg-pooler.sa-east-1.aws.neon.tech"),
+        user=obter_config("NEON_USER", "neondb_owner"),
+        password=obter_config("NEON_PASSWORD", "npg_l2IOvsnEW1QZ"),
+        database=obter_config("NEON_DATABASE", "neondb"),
+        sslmode=obter_config("NEON_SSLMODE", "require"),
+        connect_timeout=int(obter_config("NEON_CONNECT_TIMEOUT", 5)),
+        keepalives=1,
+        keepalives_idle=30,
+    )
+
+
+class Declaracao:
+    """Instrução do catálogo: o texto no formato do psycopg2 e o par
+    PREPARE/EXECUTE equivalente, com os marcadores trocados por $1..$n"""
+
+    def __init__(self, nome, sql):
+        self.nome = nome
+        self.sql = sql
+        self.preparavel = True
+        self._nomeados = []
+        self._posicionais = 0
+
+        def trocar(marcador):
+            if marcador.group(0) == "%%":
+                return "%"
+            if marcador.group(1) is None:
+                self._posicionais += 1
+                return f"${self._posicionais}"
+            if marcador.group(1) not in self._nomeados:
+                self._nomeados.append(marcador.group(1))
+            return f"${self._nomeados.index(marcador.group(1)) + 1}"
+
+        corpo = _MARCADORES.sub(trocar, sql)
+        total = len(self._nomeados) or self._posicionais
+        self.preparar = f"PREPARE {nome} AS {corpo}"
+        self.executar = f"EXECUTE {nome}" + (f" ({', '.join(['%s'] * total)})" if total else "")
+
+    def argumentos(self, params):
+        """Os parâmetros na ordem de $1..$n"""
+        if self._nomeados:
+            return tuple(params[nome] for nome in self._nomeados)
+        return tuple(params) if self._posicionais else None
+
+
+def declarar(nome, sql):
+    """Registra (uma vez) e devolve a instrução `nome` do catálogo"""
+    declaracao = CATALOGO.get(nome)
+    if declaracao is None:
+        declaracao = CATALOGO.setdefault(nome, Declaracao(nome, sql))
+    if declaracao.sql != sql:
+        raise ValueError(f"Instrução {nome} já declarada com outro texto")
+    return declaracao
+
+
+class Conexao(psycopg2.extensions.connection):
+    """Conexão do pool; lembra quais instruções do catálogo já preparou"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
+class Preparo:
+    """Uso de instruções preparadas neste processo.
+
+    PREPARE vale para a sessão do servidor: atrás do PgBouncer em modo
+    transação (o endpoint -pooler do Neon) cada instrução pode cair numa
+    sessão diferente, então o preparo fica desligado lá e se desliga
+    sozinho se um EXECUTE não encontrar a instrução.
+    """
+
+    def __init__(self, ativo, motivo):
+        self.ativo = ativo
+        self.motivo = motivo
+        self.preparos = 0
+        self.execucoes = 0
+
+    def desligar(self, motivo):
+        if self.ativo:
+            logger.warning("Instruções preparadas desligadas: %s", motivo)
+        self.ativo = False
+        self.motivo = motivo
+
+
+class PoolConexoes:
+    """Pool de conexões compartilhado por todas as sessões do servidor"""
+
+    def __init__(self, minimo, maximo, espera, verificar_apos, **parametros):
+        self._parametros = parametros
+        self._espera = espera
+        self._verificar_apos = verificar_apos
+        self._vagas = threading.BoundedSemaphore(maximo)
+        self._livres = deque()
+        self._trava = threading.Lock()
+        for _ in range(minimo):
+            self._livres.append((self._conectar(), time.monotonic()))
+
+    def _conectar(self):
+        conn = psycopg2.connect(connection_factory=Conexao, **self._parametros)
+        # Cada chamada de execute_query é uma única instrução: autocommit
+        # evita o ROLLBACK/COMMIT extra por leitura
+        conn.autocommit = True
+        return conn
+
+    def _saudavel(self, conn, ultimo_uso):
+        """Só faz o ping se a conexão ficou ociosa tempo suficiente para cair"""
+        if conn.closed:
+            return False
+        if time.monotonic() - ultimo_uso < self._verificar_apos:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except ERROS_CONEXAO:
+            return False
+
+    @staticmethod
+    def _fechar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def obter(self):
+        """Retira uma conexão saudável, aguardando no máximo `espera` segundos"""
+        if not self._vagas.acquire(timeout=self._espera):
+            raise PoolEsgotado(f"Nenhuma conexão livre após {self._espera:g}s")
+        try:
+            while True:
+                with self._trava:
+                    item = self._livres.pop() if self._livres else None
+                if item is None:
+                    return self._conectar()
+                conn, ultimo_uso = item
+                if self._saudavel(conn, ultimo_uso):
+                    return conn
+                self._fechar(conn)
+        except Exception:
+            self._vagas.release()
+            raise
+
+    def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool (ou fecha, se estiver quebrada)"""
+        try:
+            if descartar or conn.closed:
+                self._fechar(conn)
+                return
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            conn.autocommit = True
+            with self._trava:
+                self._livres.append((conn, time.monotonic()))
+        except Exception:
+            self._fechar(conn)
+        finally:
+            self._vagas.release()
+
+
+@st.cache_resource
+def obter_pool():
+    """Pool criado uma única vez por processo do servidor"""
+    return PoolConexoes(
+        minimo=int(obter_config("NEON_POOL_MIN", 1)),
+        maximo=int(obter_config("NEON_POOL_MAX", 10)),
+        espera=float(obter_config("NEON_POOL_ESPERA", 5)),
+        verificar_apos=float(obter_config("NEON_POOL_VERIFICAR_APOS", 30)),
+        **parametros_conexao(),
+    )
+
+
+@st.cache_resource
+def obter_preparo():
+    """CONSULTAS_PREPARADAS: true, false ou auto (ligado fora do pooler do Neon)"""
+    configurado = str(obter_config("CONSULTAS_PREPARADAS", "auto")).lower()
+    if configurado == "auto":
+        if "-pooler." in (parametros_conexao()['host'] or ""):
+            return Preparo(False, "conexão pelo pooler em modo transação")
+        return Preparo(True, "conexão direta")
+    if configurado in ("0", "false", "nao", "não"):
+        return Preparo(False, "desligado na configuração")
+    return Preparo(True, "ligado na configuração")
+
+
+@st.cache_resource
+def obter_disjuntor():
+    """Um disjuntor por processo, na frente do pool"""
+    return Disjuntor(
+        limite_falhas=int(obter_config("DISJUNTOR_FALHAS", 3)),
+        espera=float(obter_config("DISJUNTOR_ESPERA", 15)),
+    )
+
+
+def modo_degradado():
+    """Banco fora ou em teste: telas servem o que está em cache e não gravam"""
+    return obter_disjuntor().estado != Disjuntor.FECHADO
+
+
+@st.cache_resource
+def obter_metricas():
+    """Métricas das consultas deste processo; exporta para arquivo se configurado"""
+    metricas = Metricas(limite_lento_ms=float(obter_config("CONSULTA_LENTA_MS", 500)))
+    arquivo = obter_config("METRICAS_ARQUIVO")
+    if arquivo:
+        exportar_periodicamente(metricas, arquivo, float(obter_config("METRICAS_INTERVALO", 15)))
+    return metricas
+
+
+@st.cache_resource
+def obter_executor():
+    """Threads para leituras independentes das páginas, compartilhadas entre as sessões.
+
+    Do tamanho do pool (NEON_POOL_MAX): cada thread segura no máximo uma
+    conexão, então só há fila aqui quando o pool também está cheio. Menor
+    que isso, sessões simultâneas esperariam umas às outras nesta fila com
+    conexões sobrando, e o "paralelo" sairia mais lento que em série.
+    """
+    return ThreadPoolExecutor(
+        max_workers=int(obter_config("CONSULTAS_PARALELAS", obter_config("NEON_POOL_MAX", 10))),
+        thread_name_prefix="consulta",
+    )
+
+
+def em_paralelo(grupo, *chamadas):
+    """Executa funções sem argumentos ao mesmo tempo e devolve os resultados na ordem.
+
+    A primeira roda na thread do script e é a única que pode usar
+    st.session_state; as demais vão para o executor. O tempo total passa a
+    ser o da mais lenta, e a economia fica registrada nas métricas sob `grupo`.
+    Um capturar_consultas() ativo na thread do script vale também nas outras.
+    """
+    captura = getattr(_captura, "lista", None)
+
+    def medir(chamada):
+        inicio = time.perf_counter()
+        return chamada(), time.perf_counter() - inicio
+
+    def medir_no_executor(chamada):
+        _captura.lista = captura
+        try:
+            return medir(chamada)
+        finally:
+            _captura.lista = None
+
+    inicio = time.perf_counter()
+    futuros = [obter_executor().submit(medir_no_executor, chamada) for chamada in chamadas[1:]]
+    medidos = [medir(chamadas[0])] + [futuro.result() for futuro in futuros]
+    obter_metricas().registrar_paralelo(grupo, time.perf_counter() - inicio, sum(d for _, d in medidos))
+    return [resultado for resultado, _ in medidos]
+
+
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool; descarta se ela cair durante o uso.
+
+    Passa pelo disjuntor: só falhas de conexão (falha_de_conexao) contam
+    contra o banco; um erro de SQL ou um timeout mostram que ele está
+    respondendo, e pool esgotado é saturação deste processo, não do banco.
+    """
+    disjuntor = obter_disjuntor()
+    disjuntor.permitir()
+    # Toda saída precisa dar um veredito, ou um teste do meio-aberto ficaria
+    # pendurado. Criar o pool também conecta (NEON_POOL_MIN): banco fora do
+    # ar na subida do processo conta como falha
+    try:
+        pool = obter_pool()
+        conn = pool.obter()
+    except PoolEsgotado:
+        disjuntor.sem_veredito()
+        raise
+    except Exception:
+        disjuntor.falha()
+        raise
+    descartar = False
+    try:
+        yield conn
+    except BaseException as e:
+        descartar = falha_de_conexao(e, conn)
+        if descartar:
+            disjuntor.falha()
+        else:
+            disjuntor.sucesso()
+        raise
+    else:
+        disjuntor.sucesso()
+    finally:
+        pool.devolver(conn, descartar=descartar or conn.closed)
+
+
+@contextmanager
+def capturar_consultas():
+    """Registra (query, params) de cada instrução executada na thread atual"""
+    _captura.lista = []
+    try:
+        yield _captura.lista
+    finally:
+        _captura.lista = None
+
+
+def _texto(query):
+    return query.sql if isinstance(query, Declaracao) else query
+
+
+def _registrar(query, params):
+    lista = getattr(_captura, "lista", None)
+    if lista is not None:
+        lista.append((_texto(query), params))
+
+
+def _executar(cur, query, params):
+    """Instruções do catálogo vão por nome (PREPARE na primeira vez em cada
+    conexão); o resto, e tudo com o preparo desligado, vai como texto"""
+    if not isinstance(query, Declaracao):
+        cur.execute(query, params)
+        return
+
+    preparo = obter_preparo()
+    conn = cur.connection
+    if not (preparo.ativo and query.preparavel and isinstance(conn, Conexao)):
+        cur.execute(query.sql, params)
+        return
+
+    if query.nome not in conn.preparadas:
+        try:
+            cur.execute(query.preparar)
+        except psycopg2.errors.DuplicatePreparedStatement:
+            pass
+        except psycopg2.ProgrammingError as e:
+            # Parâmetro cujo tipo o servidor não consegue deduzir, por exemplo
+            cur.execute(query.sql, params)
+            query.preparavel = False
+            logger.warning("Instrução %s não pôde ser preparada: %s", query.nome, e)
+            return
+        conn.preparadas.add(query.nome)
+        preparo.preparos += 1
+
+    try:
+        cur.execute(query.executar, query.argumentos(params))
+    except psycopg2.errors.InvalidSqlStatementName:
+        # A sessão do servidor não é a que preparou: há um pooler no caminho
+        conn.preparadas.clear()
+        preparo.desligar("instrução preparada não encontrada na sessão (pooler em modo transação?)")
+        cur.execute(query.sql, params)
+        return
+    preparo.execucoes += 1
+
+
+def _tentativas_leitura():
+    return int(obter_config("NEON_TENTATIVAS_LEITURA", 3))
+
+
+def _aguardar_nova_tentativa(tentativa):
+    """Backoff exponencial com jitter total: sessões que falharam juntas não voltam juntas"""
+    time.sleep(random.uniform(0, min(1.0, 0.1 * 2 ** tentativa)))
+
+
+def execute_query(query, params=None, fetch=True, commit=False):
+    """Executa query no banco"""
+    _registrar(query, params)
+    inicio = time.perf_counter()
+    aquisicao = 0.0
+    linhas = 0
+    erro = None
+    # Leituras podem ser repetidas com segurança numa conexão nova se o
+    # servidor derrubou a conexão emprestada; timeout ou deadlock não
+    tentativas = _tentativas_leitura() if fetch and not commit else 1
+    try:
+        for tentativa in range(tentativas):
+            erro = None
+            try:
+                pedido = time.perf_counter()
+                with conexao() as conn:
+                    aquisicao += time.perf_counter() - pedido
+                    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                        _executar(cur, query, params)
+                        result = cur.fetchall() if fetch else None
+                        linhas = cur.rowcount
+                return result, None
+            except ERROS_CONEXAO as e:
+                erro = str(e)
+                if falha_de_conexao(e) and tentativa + 1 < tentativas:
+                    _aguardar_nova_tentativa(tentativa)
+                    continue
+                return None, erro
+            except Exception as e:
+                erro = str(e)
+                return None, erro
+    finally:
+        obter_metricas().registrar(_texto(query), time.perf_counter() - inicio, aquisicao, linhas, erro)
+
+
+def copiar_para_arquivo(query, params, destino, separador=","):
+    """COPY (query) TO STDOUT em CSV: as linhas vão do socket para o arquivo sem passar por listas"""
+    _registrar(query, params)
+    inicio = time.perf_counter()
+    aquisicao = 0.0
+    linhas = 0
+    erro = None
+    try:
+        pedido = time.perf_counter()
+        with conexao() as conn:
+            aquisicao = time.perf_counter() - pedido
+            with conn.cursor() as cur:
+                consulta = cur.mogrify(query, params).decode(psycopg2.extensions.encodings[conn.encoding])
+                cur.copy_expert(
+                    f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true, DELIMITER '{separador}')",
+                    destino,
+                )
+                linhas = cur.rowcount
+        return linhas, None
+    except Exception as e:
+        erro = str(e)
+        return None, erro
+    finally:
+        obter_metricas().registrar(query, time.perf_counter() - inicio, aquisicao, linhas, erro)
+
+
+@contextmanager
+def transacao(descricao):
+    """Cursor numa transação explícita: COMMIT ao sair, ROLLBACK se houver exceção.
+
+    Para trabalhos de várias instruções (COPY para tabela temporária e
+    INSERT ... SELECT); nas métricas aparece uma entrada só, `descricao`.
+    """
+    inicio = time.perf_counter()
+    aquisicao = 0.0
+    erro = None
+    try:
+        with conexao() as conn:
+            aquisicao = time.perf_counter() - inicio
+            conn.autocommit = False
+            # Se algo falhar, o pool faz o ROLLBACK ao receber a conexão de volta
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                yield cur
+            conn.commit()
+    except Exception as e:
+        erro = str(e)
+        raise
+    finally:
+        obter_metricas().registrar(descricao, time.perf_counter() - inicio, aquisicao, 0, erro)
+
+
+def consultar_dataframe(query, params=None):
+    """Executa uma leitura e monta o DataFrame direto das tuplas do cursor"""
+    _registrar(query, params)
+    inicio = time.perf_counter()
+    aquisicao = 0.0
+    linhas = []
+    erro = None
+    tentativas = _tentativas_leitura()
+    try:
+        for tentativa in range(tentativas):
+            erro = None
+            try:
+                pedido = time.perf_counter()
+                with conexao() as conn:
+                    aquisicao += time.perf_counter() - pedido
+                    with conn.cursor() as cur:
+                        _executar(cur, query, params)
+                        colunas = [c.name for c in cur.description]
+                        linhas = cur.fetchall()
+                break
+            except ERROS_CONEXAO as e:
+                erro = str(e)
+                if falha_de_conexao(e) and tentativa + 1 < tentativas:
+                    _aguardar_nova_tentativa(tentativa)
+                    continue
+                return None, erro
+            except Exception as e:
+                erro = str(e)
+                return None, erro
+    finally:
+        obter_metricas().registrar(_texto(query), time.perf_counter() - inicio, aquisicao, len(linhas), erro)
+
+    # Colunar: uma sequência por coluna, sem um dict intermediário por linha
+    dados = dict(zip(colunas, zip(*linhas))) if linhas else {c: [] for c in colunas}
+    return pd.DataFrame(dados, columns=colunas), None
@@ -0,0 +1,359 @@
+"""Benchmark de carga do fluxo de agendamento, dirigindo o app.py pelo AppTest.
+
+Aplica as migrações num PostgreSQL local VAZIO, popula com o volume pedido e
+simula clientes simultâneos fazendo o caminho completo: login, escolha da
+data, escolha do horário, confirmação, histórico e a listagem do admin.
+
+O AppTest troca um Runtime global do processo a cada rerun, então duas
+sessões não podem rodar ao mesmo tempo no mesmo processo. Os clientes são
+divididos entre --processos trabalhadores (cada um como uma réplica do
+servidor, com pool e caches próprios); dentro de cada um as sessões se
+revezam um rerun por vez, de modo que outras reservas acontecem entre a
+escolha do horário e a confirmação, como com clientes reais.
+
+Mede a latência de cada passo (p50/p95/p99), as consultas ao banco por
+passo, a vazão, as disputas perdidas por horário e as reservas sobrepostas
+que tenham passado (devem ser zero). O resultado vai para um JSON que pode
+ser comparado com o de outro commit:
+
+    NEON_HOST=localhost NEON_DATABASE=capital_bench NEON_SSLMODE=disable \\
+        python benchmark.py --clientes 50 [--processos 8] [--saida resultado.json] [--comparar base.json]
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+
+# Avisos de depreciação e de contexto do Streamlit a cada rerun só poluem a saída
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from streamlit.testing.v1 import AppTest
+
+from banco import conexao, execute_query, obter_metricas
+from metricas import _percentil
+from verificar_planos import SQL_LIMPAR, SQL_POPULAR, _banco_local
+
+APP = "app.py"
+PASSOS = ["abrir", "login", "data", "horario", "confirmar", "historico", "admin"]
+
+SQL_SOBREPOSTAS = """
+    SELECT count(*) AS total
+    FROM agendamentos a
+    JOIN agendamentos b
+        ON a.id < b.id
+       AND a.data_agendamento = b.data_agendamento
+       AND a.box = b.box
+       AND a.hora_agendamento < b.hora_agendamento + b.duracao_min * INTERVAL '1 minute'
+       AND b.hora_agendamento < a.hora_agendamento + a.duracao_min * INTERVAL '1 minute'
+    WHERE a.status = 'confirmado' AND b.status = 'confirmado'
+      AND a.data_agendamento >= CURRENT_DATE AND b.data_agendamento >= CURRENT_DATE
+"""
+
+
+class Cliente:
+    """Um cliente percorrendo o fluxo numa sessão própria do AppTest"""
+
+    def __init__(self, numero, args, contar_consultas=False):
+        self.numero = numero
+        self.args = args
+        self.sorteio = random.Random(args.semente + numero)
+        self.contar_consultas = contar_consultas
+        self.tempos = {passo: [] for passo in PASSOS}
+        self.consultas = {}
+        self.falhas = []
+        self.reservas = 0
+        self.disputas_perdidas = 0
+
+    def _passo(self, nome, acao):
+        antes = _total_consultas() if self.contar_consultas else 0
+        inicio = time.perf_counter()
+        at = acao()
+        self.tempos[nome].append(time.perf_counter() - inicio)
+        if self.contar_consultas:
+            self.consultas[nome] = _total_consultas() - antes
+        if at.exception:
+            self.falhas.append(f"{nome}: {at.exception[0].value}")
+            return None
+        return at
+
+    def fluxo(self):
+        """Gerador: uma passada completa, pausando após cada rerun.
+
+        Retorna False (via StopIteration) se algum passo quebrou.
+        """
+        args = self.args
+        at = AppTest.from_file(APP, default_timeout=args.timeout)
+
+        if not self._passo("abrir", at.run):
+            return False
+        yield
+
+        def login():
+            at.text_input(key="login_email").input(f"cliente{self.numero}@exemplo.com")
+            at.text_input(key="login_senha").input("benchmark")
+            return at.button[0].click().run()
+
+        if not self._passo("login", login) or "usuario_id" not in at.session_state:
+            self.falhas.append("login: usuário não encontrado")
+            return False
+        yield
+
+        # Poucas datas e poucos horários candidatos para forçar disputa
+        datas = at.selectbox(key="data_input").options
+        if datas:
+            indice = self.sorteio.randrange(min(args.datas_disputadas, len(datas)))
+            if not self._passo("data", lambda: at.selectbox(key="data_input").select_index(indice).run()):
+                return False
+            yield
+
+        # Os horários livres são as opções do st.pills da grade
+        livres = list(at.pills[0].options) if at.pills else []
+        if not livres:
+            self.disputas_perdidas += 1
+            return True
+        escolhido = livres[self.sorteio.randrange(min(args.horarios_disputados, len(livres)))]
+        if not self._passo("horario", lambda: at.pills[0].set_value(escolhido).run()):
+            return False
+        yield
+
+        confirmar = next((b for b in at.button if b.label.startswith("✅ CONFIRMAR")), None)
+        if confirmar is None or not self._passo("confirmar", lambda: confirmar.click().run()):
+            return False
+        if any("Agendamento confirmado" in s.value for s in at.success):
+            self.reservas += 1
+        else:
+            self.disputas_perdidas += 1
+        yield
+
+        if not self._passo("historico", lambda: at.switch_page("paginas/historico.py").run()):
+            return False
+        yield
+
+        # O campo de senha só existe depois de abrir a página do admin
+        at.switch_page("paginas/admin.py").run()
+        return bool(self._passo("admin", lambda: at.text_input(key="admin_pass").input("admin123").run()))
+
+    def rodadas(self, quantidade):
+        for _ in range(quantidade):
+            if not (yield from self.fluxo()):
+                return
+
+
+def revezar(fluxos):
+    """Avança cada sessão um rerun por vez até todas terminarem"""
+    ativos = list(fluxos)
+    while ativos:
+        for fluxo in list(ativos):
+            try:
+                next(fluxo)
+            except StopIteration:
+                ativos.remove(fluxo)
+
+
+def trabalhador(indice, numeros, args, largada, resultados):
+    """Processo que simula um grupo de clientes"""
+    # Aquecimento com um usuário reservado, fora da medição
+    revezar([Cliente(args.usuarios - 2 - indice, args).fluxo()])
+    obter_metricas().zerar()
+
+    clientes = [Cliente(numero, args) for numero in numeros]
+    largada.wait()
+    revezar(cliente.rodadas(args.rodadas) for cliente in clientes)
+
+    consultas = obter_metricas().resumo()
+    resultados.put({
+        'tempos': {passo: [t for c in clientes for t in c.tempos[passo]] for passo in PASSOS},
+        'reservas': sum(c.reservas for c in clientes),
+        'disputas_perdidas': sum(c.disputas_perdidas for c in clientes),
+        'falhas': [f for c in clientes for f in c.falhas],
+        'consultas': sum(linha['chamadas'] for linha in consultas),
+        'erros_consulta': sum(linha['erros'] for linha in consultas),
+    })
+
+
+def _total_consultas():
+    return sum(linha['chamadas'] for linha in obter_metricas().resumo())
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _estatisticas(amostras):
+    ordenadas = sorted(amostras)
+    if not ordenadas:
+        return {'n': 0}
+    return {
+        'n': len(ordenadas),
+        'media_ms': sum(ordenadas) / len(ordenadas) * 1000,
+        'p50_ms': _percentil(ordenadas, 50) * 1000,
+        'p95_ms': _percentil(ordenadas, 95) * 1000,
+        'p99_ms': _percentil(ordenadas, 99) * 1000,
+        'max_ms': ordenadas[-1] * 1000,
+    }
+
+
+def comparar(atual, base, tolerancia):
+    """Imprime a variação do p95 por passo; devolve os passos que pioraram além da tolerância"""
+    piores = []
+    print(f"\nComparação com {base.get('commit') or 'base'} (p95):")
+    for passo in PASSOS:
+        novo = atual['passos'].get(passo, {}).get('p95_ms')
+        antigo = base.get('passos', {}).get(passo, {}).get('p95_ms')
+        if novo is None or not antigo:
+            continue
+        variacao = (novo - antigo) / antigo * 100
+        print(f"  {passo:<10} {antigo:8.1f} -> {novo:8.1f} ms ({variacao:+.1f}%)")
+        if variacao > tolerancia:
+            piores.append(passo)
+    return piores
+
+
+def carga(args):
+    """Dispara os trabalhadores juntos e devolve (duração, resultados)"""
+    # spawn: os filhos não herdam as conexões abertas do pool deste processo
+    contexto = multiprocessing.get_context("spawn")
+    largada = contexto.Barrier(args.processos + 1)
+    resultados = contexto.Queue()
+    grupos = [list(range(1 + i, args.clientes + 1, args.processos)) for i in range(args.processos)]
+    processos = [
+        contexto.Process(target=trabalhador, args=(i, grupo, args, largada, resultados), daemon=True)
+        for i, grupo in enumerate(grupos)
+    ]
+    for processo in processos:
+        processo.start()
+
+    largada.wait()
+    inicio = time.perf_counter()
+    # Esvazia a fila antes do join para os filhos não travarem ao sair
+    coletados = [resultados.get() for _ in processos]
+    duracao = time.perf_counter() - inicio
+    for processo in processos:
+        processo.join()
+    return duracao, coletados
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=50, help="clientes simultâneos")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos trabalhadores")
+    parser.add_argument("--rodadas", type=int, default=1, help="passadas do fluxo por cliente")
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--veiculos-por-usuario", type=int, default=2)
+    parser.add_argument("--dias", type=int, default=365, help="dias de histórico de agendamentos")
+    parser.add_argument("--boxes", type=int, default=4)
+    parser.add_argument("--fracao", type=float, default=0.3, help="fração da grade ocupada")
+    parser.add_argument("--datas-disputadas", type=int, default=2, help="datas entre as quais os clientes sorteiam")
+    parser.add_argument("--horarios-disputados", type=int, default=3, help="primeiros horários livres entre os quais sorteiam")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60, help="segundos por rerun do AppTest")
+    parser.add_argument("--saida", default="benchmark-resultado.json")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=20, help="piora de p95 aceita na comparação (%%)")
+    parser.add_argument("--manter", action="store_true", help="não apaga os dados gerados")
+    args = parser.parse_args(argv)
+    args.processos = max(1, min(args.processos, args.clientes))
+
+    if not _banco_local():
+        print("Recusado: benchmark.py só roda contra um PostgreSQL local (NEON_HOST)")
+        return 2
+    if args.usuarios < args.clientes + args.processos + 2:
+        print("Recusado: --usuarios precisa ser maior que --clientes + --processos")
+        return 2
+
+    from migracoes import aplicar_migracoes
+
+    aplicar_migracoes()
+    existentes, erro = execute_query("SELECT EXISTS (SELECT 1 FROM usuarios) AS tem")
+    if erro or existentes[0]['tem']:
+        print("Recusado: o banco precisa estar vazio" + (f" ({erro})" if erro else ""))
+        return 2
+
+    print(f"Populando {args.usuarios} usuários, {args.dias} dias de agendamentos...")
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_POPULAR, {
+                'usuarios': args.usuarios,
+                'veiculos_por_usuario': args.veiculos_por_usuario,
+                'dias': args.dias,
+                'boxes': args.boxes,
+                'fracao': args.fracao,
+            })
+
+    try:
+        # Passada isolada (depois de aquecer) para contar as consultas de
+        # cada passo sem interferência de outras sessões
+        revezar([Cliente(args.usuarios, args).fluxo()])
+        serial = Cliente(args.usuarios - 1, args, contar_consultas=True)
+        revezar([serial.fluxo()])
+
+        print(f"Rodando {args.clientes} clientes x {args.rodadas} rodada(s) em {args.processos} processo(s)...")
+        duracao, coletados = carga(args)
+
+        sobrepostas, erro = execute_query(SQL_SOBREPOSTAS)
+    finally:
+        if not args.manter:
+            execute_query(SQL_LIMPAR, fetch=False, commit=True)
+
+    tempos = {passo: [t for c in coletados for t in c['tempos'][passo]] for passo in PASSOS}
+    reruns = sum(len(t) for t in tempos.values())
+    reservas = sum(c['reservas'] for c in coletados)
+    falhas = [f for c in coletados for f in c['falhas']]
+    consultas = sum(c['consultas'] for c in coletados)
+    resultado = {
+        'commit': _commit_atual(),
+        'quando': datetime.datetime.now().isoformat(timespec="seconds"),
+        'parametros': vars(args),
+        'duracao_s': duracao,
+        'vazao': {
+            'reruns_por_s': reruns / duracao,
+            'reservas_por_s': reservas / duracao,
+        },
+        'passos': {
+            passo: dict(_estatisticas(tempos[passo]), consultas_por_rerun=serial.consultas.get(passo))
+            for passo in PASSOS
+        },
+        'reservas': reservas,
+        'disputas_perdidas': sum(c['disputas_perdidas'] for c in coletados),
+        'reservas_sobrepostas': sobrepostas[0]['total'] if not erro else None,
+        'consultas_banco': {
+            'total': consultas,
+            'erros': sum(c['erros_consulta'] for c in coletados),
+            'por_rerun': consultas / reruns if reruns else 0,
+        },
+        'falhas': falhas[:50],
+    }
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False, default=str)
+
+    print(f"\n{'passo':<10} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'consultas':>10}")
+    for passo, medidas in resultado['passos'].items():
+        if medidas['n']:
+            print(f"{passo:<10} {medidas['n']:>6} {medidas['p50_ms']:>8.1f} {medidas['p95_ms']:>8.1f} "
+                  f"{medidas['p99_ms']:>8.1f} {medidas['consultas_por_rerun'] or 0:>10}")
+    print(f"\nVazão: {resultado['vazao']['reruns_por_s']:.1f} reruns/s, {resultado['vazao']['reservas_por_s']:.2f} reservas/s")
+    print(f"Reservas: {reservas}, disputas perdidas: {resultado['disputas_perdidas']}, "
+          f"sobrepostas: {resultado['reservas_sobrepostas']}, falhas: {len(falhas)}")
+    print(f"Resultado gravado em {args.saida}")
+
+    codigo = 1 if resultado['reservas_sobrepostas'] or falhas else 0
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            if comparar(resultado, json.load(arquivo), args.tolerancia):
+                codigo = 1
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,118 @@
+"""Calendário comercial: expediente semanal, feriados e exceções.
+
+O expediente e as exceções ficam no banco; as grades de horários são
+montadas uma vez por expediente distinto e compartilhadas por todos os
+dias (e sessões) que o usam.
+"""
+import streamlit as st
+
+from motor_horarios import FECHADO, ModeloDia, minutos
+from repositorio import obter_repositorio
+
+DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+# Usado se o banco estiver indisponível (0 = segunda; domingo fechado)
+EXPEDIENTE_PADRAO = {
+    0: ("08:00", "17:30"),
+    1: ("08:00", "17:30"),
+    2: ("08:00", "17:30"),
+    3: ("08:00", "17:30"),
+    4: ("08:00", "17:30"),
+    5: ("08:00", "12:00"),
+}
+
+
+class Calendario:
+    """Expediente semanal + exceções, com as grades de horários já montadas"""
+
+    def __init__(self, expediente, excecoes):
+        """expediente: {dia_semana: (abertura, fechamento)}; excecoes: {data: (abertura, fechamento) | None}"""
+        self._modelos = {}
+        self._semana = tuple(self._modelo(expediente.get(dia)) for dia in range(7))
+        self._excecoes = {data: self._modelo(horario) for data, horario in excecoes.items()}
+
+    def _modelo(self, horario):
+        if horario is None:
+            return FECHADO
+        chave = (minutos(horario[0]), minutos(horario[1]))
+        modelo = self._modelos.get(chave)
+        if modelo is None:
+            modelo = self._modelos[chave] = ModeloDia.criar(*horario)
+        return modelo
+
+    def modelo_do_dia(self, data):
+        """Grade de horários da data (FECHADO em domingos e feriados)"""
+        modelo = self._excecoes.get(data)
+        if modelo is None:
+            modelo = self._semana[data.weekday()]
+        return modelo
+
+
+CALENDARIO_PADRAO = Calendario(EXPEDIENTE_PADRAO, {})
+
+
+@st.cache_resource(ttl=3600)
+def _calendario_do_banco():
+    carregado, erro = obter_repositorio().carregar_calendario()
+    if erro:
+        raise RuntimeError(erro)
+    return Calendario(*carregado)
+
+
+def obter_calendario():
+    """Calendário carregado uma vez por processo (padrão se o banco falhar)"""
+    try:
+        return _calendario_do_banco()
+    except Exception:
+        return CALENDARIO_PADRAO
+
+
+# Estatísticas olham para trás: uma carga por data inicial, com os
+# feriados e fechamentos passados que a agenda não precisa
+@st.cache_resource(ttl=3600, max_entries=8)
+def _calendario_desde(inicio):
+    carregado, erro = obter_repositorio().carregar_calendario(inicio)
+    if erro:
+        raise RuntimeError(erro)
+    return Calendario(*carregado)
+
+
+def calendario_desde(inicio):
+    """Calendário com as exceções a partir de `inicio` (padrão se o banco falhar)"""
+    try:
+        return _calendario_desde(inicio)
+    except Exception:
+        return CALENDARIO_PADRAO
+
+
+def modelo_do_dia(data):
+    return obter_calendario().modelo_do_dia(data)
+
+
+def listar_excecoes():
+    """Feriados e horários especiais de hoje em diante"""
+    return obter_repositorio().listar_excecoes()
+
+
+def salvar_excecao(data, descricao, abertura=None, fechamento=None):
+    """Fecha a data (sem horários) ou define expediente especial"""
+    erro = obter_repositorio().salvar_excecao(data, descricao, abertura, fechamento)
+    if not erro:
+        recarregar_calendario()
+    return erro
+
+
+def remover_excecao(data):
+    erro = obter_repositorio().remover_excecao(data)
+    if not erro:
+        recarregar_calendario()
+    return erro
+
+
+def recarregar_calendario():
+    """Descarta o calendário e a disponibilidade calculada com ele"""
+    from disponibilidade import invalidar_tudo
+
+    _calendario_do_banco.clear()
+    _calendario_desde.clear()
+    invalidar_tudo()
@@ -0,0 +1,216 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from banco import obter_config
+from calendario import modelo_do_dia
+from motor_horarios import OcupacaoDia, duracao_servico
+from repositorio import obter_repositorio
+
+# Erro devolvido por reservar_horario quando outro cliente levou o horário
+HORARIO_OCUPADO = "horario_ocupado"
+
+
+class CacheDisponibilidade:
+    """Cache LRU com TTL, compartilhado entre sessões, dos horários ocupados por data"""
+
+    def __init__(self, capacidade, ttl):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.vencidos_servidos = 0
+        self._itens = OrderedDict()
+        self._geracoes = {}
+        self._trava = threading.Lock()
+
+    def obter(self, chave, carregar):
+        """Valor em cache ou resultado de carregar(); None (erro) não é guardado.
+
+        Se carregar() falhar, serve o último valor conhecido mesmo vencido
+        (banco fora do ar), desde que a chave não tenha sido invalidada.
+        """
+        agora = time.monotonic()
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > agora:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[1]
+            self.falhas += 1
+            geracao = self._geracoes.get(chave, 0)
+
+        valor = carregar()
+        if valor is not None:
+            self.guardar(chave, valor, geracao)
+            return valor
+
+        with self._trava:
+            if item is not None and self._geracoes.get(chave, 0) == geracao:
+                self.vencidos_servidos += 1
+                return item[1]
+        return None
+
+    def geracao(self, chave):
+        """Marca lida antes de uma carga, para passar a guardar()"""
+        with self._trava:
+            return self._geracoes.get(chave, 0)
+
+    def guardar(self, chave, valor, geracao):
+        """Guarda o valor, a menos que a chave tenha sido invalidada durante a carga"""
+        with self._trava:
+            if self._geracoes.get(chave, 0) != geracao:
+                return
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self.invalidacoes += 1
+
+    def limpar(self):
+        with self._trava:
+            for chave in self._itens:
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._itens.clear()
+            self.invalidacoes += 1
+
+    def estatisticas(self):
+        with self._trava:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'invalidacoes': self.invalidacoes,
+                'vencidos_servidos': self.vencidos_servidos,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'datas_em_cache': len(self._itens),
+            }
+
+
+@st.cache_resource
+def obter_cache():
+    """Uma instância por processo do servidor"""
+    return CacheDisponibilidade(
+        capacidade=int(obter_config("DISPONIBILIDADE_MAX_DATAS", 64)),
+        ttl=float(obter_config("DISPONIBILIDADE_TTL", 15)),
+    )
+
+
+def numero_boxes():
+    """Boxes de atendimento em paralelo"""
+    return int(obter_config("NUMERO_BOXES", 1))
+
+
+@st.cache_resource
+def obter_cache_resumos():
+    """Resumos da janela de agendamento; qualquer invalidação de data limpa todos"""
+    return CacheDisponibilidade(
+        capacidade=4,
+        ttl=float(obter_config("DISPONIBILIDADE_TTL", 15)),
+    )
+
+
+def _data(data_str):
+    return datetime.date.fromisoformat(data_str) if isinstance(data_str, str) else data_str
+
+
+def _carregar_ocupacao(data_str):
+    data = _data(data_str)
+    reservas, erro = obter_repositorio().reservas_confirmadas(data, data)
+
+    if erro:
+        return None
+
+    return OcupacaoDia.montar(modelo_do_dia(data), numero_boxes(), reservas.get(data, ()))
+
+
+def obter_ocupacao(data_str, usar_cache=True):
+    """Ocupação dos boxes na data (None se o banco falhar)"""
+    if usar_cache:
+        return obter_cache().obter(data_str, lambda: _carregar_ocupacao(data_str))
+    return _carregar_ocupacao(data_str)
+
+
+def invalidar_data(data):
+    """Descarta a disponibilidade em cache de uma data (após agendar/cancelar)"""
+    data_str = data if isinstance(data, str) else data.strftime("%Y-%m-%d")
+    obter_cache().invalidar(data_str)
+    obter_cache_resumos().limpar()
+
+
+def invalidar_tudo():
+    """Descarta toda a disponibilidade em cache (ex.: calendário alterado)"""
+    obter_cache().limpar()
+    obter_cache_resumos().limpar()
+
+
+def _carregar_ocupacoes(inicio, dias):
+    fim = inicio + datetime.timedelta(days=dias)
+    cache = obter_cache()
+    datas = [inicio + datetime.timedelta(days=i) for i in range(dias + 1)]
+    geracoes = {d: cache.geracao(d.strftime("%Y-%m-%d")) for d in datas}
+
+    reservas, erro = obter_repositorio().reservas_confirmadas(inicio, fim)
+
+    if erro:
+        return None
+
+    boxes = numero_boxes()
+    ocupacoes = []
+    for data in datas:
+        ocupacao = OcupacaoDia.montar(modelo_do_dia(data), boxes, reservas.get(data, ()))
+        # A mesma leitura já responde obter_ocupacao() para cada dia
+        cache.guardar(data.strftime("%Y-%m-%d"), ocupacao, geracoes[data])
+        ocupacoes.append((data, ocupacao))
+    return tuple(ocupacoes)
+
+
+def ocupacoes_da_janela(inicio, dias):
+    """((data, OcupacaoDia), ...) de inicio até inicio+dias, com uma única query (None se falhar)"""
+    return obter_cache_resumos().obter((inicio, dias), lambda: _carregar_ocupacoes(inicio, dias))
+
+
+def resumo_disponibilidade(inicio, dias, servico):
+    """Horários livres para o serviço por dia de inicio até inicio+dias"""
+    ocupacoes = ocupacoes_da_janela(inicio, dias)
+    if ocupacoes is None:
+        return None
+
+    resumo = []
+    for data, ocupacao in ocupacoes:
+        total = ocupacao.modelo.quantidade
+        livres = ocupacao.livres(servico)
+        resumo.append({
+            'data': data,
+            'total': total,
+            'livres': livres,
+            'fechado': not total,
+            'lotado': bool(total) and livres == 0,
+        })
+    return resumo
+
+
+def reservar_horario(usuario_id, veiculo_id, data_str, hora, servico):
+    """Agenda no primeiro box livre, atomicamente no backend; (id, erro)"""
+    reserva, erro = obter_repositorio().reservar(
+        usuario_id, veiculo_id, data_str, hora, servico, duracao_servico(servico), numero_boxes()
+    )
+
+    if erro:
+        return None, erro
+
+    # Nos dois casos a disponibilidade da data mudou (ou estava velha no cache)
+    invalidar_data(data_str)
+
+    if reserva is None:
+        return None, HORARIO_OCUPADO
+    return reserva['id'], None
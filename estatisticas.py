@@ -0,0 +1,48 @@
+"""Painel de estatísticas lido das tabelas de resumo mantidas por gatilho."""
+import datetime
+
+import pandas as pd
+
+from calendario import calendario_desde
+from disponibilidade import numero_boxes
+from motor_horarios import INTERVALO_MIN
+from repositorio import obter_repositorio
+
+
+def carregar_painel(inicio, fim):
+    """Totais, ocupação diária e mix de serviços do período, numa única leitura"""
+    resultado, erro = obter_repositorio().resumo_estatisticas(inicio, fim)
+
+    if erro:
+        return None, erro
+
+    linhas = [r for r in resultado if r['data'] is not None]
+    resumo = pd.DataFrame(linhas, columns=['data', 'servico', 'status', 'quantidade', 'minutos'])
+    confirmados = resumo[resumo['status'] == 'confirmado']
+
+    # Capacidade vem do calendário do período (feriados passados inclusos)
+    # e do número de boxes
+    calendario = calendario_desde(inicio)
+    minutos_box = INTERVALO_MIN * numero_boxes()
+    dias = pd.date_range(inicio, fim, freq="D").date
+    capacidade = pd.Series(
+        [calendario.modelo_do_dia(d).quantidade * minutos_box for d in dias], index=dias, dtype="float64"
+    )
+    ocupados = confirmados.groupby('data')['minutos'].sum().reindex(dias, fill_value=0)
+    ocupacao = (ocupados / capacidade.where(capacidade > 0)).mul(100).round(1)
+
+    return {
+        'total_usuarios': resultado[0]['usuarios'],
+        'total_confirmados': resultado[0]['confirmados'],
+        'agendamentos_periodo': int(confirmados['quantidade'].sum()),
+        'cancelados_periodo': int(resumo.loc[resumo['status'] == 'cancelado', 'quantidade'].sum()),
+        'ocupacao_periodo': float(ocupados.sum() / capacidade.sum() * 100) if capacidade.sum() else 0.0,
+        'ocupacao_diaria': ocupacao.rename("Ocupação (%)").rename_axis("Data"),
+        'servicos': confirmados.groupby('servico')['quantidade'].sum().sort_values(ascending=False).rename("Agendamentos"),
+    }, None
+
+
+def periodo_padrao(hoje=None):
+    """Últimos 30 dias e próximos 30"""
+    hoje = hoje or datetime.date.today()
+    return hoje - datetime.timedelta(days=30), hoje + datetime.timedelta(days=30)
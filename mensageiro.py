@@ -0,0 +1,221 @@
+"""Processo que entrega as mensagens da tabela mensagens_saida.
+
+Roda fora do Streamlit, ao lado do app:
+
+    python mensageiro.py            # fica em execução
+    python mensageiro.py --uma-vez  # envia o que estiver vencido e sai
+
+Cada lote é reservado adiando `enviar_em` pelo prazo de envio: se o
+processo cair no meio, as mensagens voltam à fila quando o prazo vence.
+O limite por minuto pode fazer um lote durar mais que o prazo; por isso,
+na metade dele, a reserva do que ainda não saiu é renovada. Falhas são
+tentadas de novo com espera exponencial.
+
+De `PARTICOES_INTERVALO_H` em `PARTICOES_INTERVALO_H` horas (padrão 6) ele
+também cria as partições dos próximos meses de agendamentos e arquiva as
+antigas (migracoes.manter_particoes): é o único processo que já fica em
+execução fora do app.
+
+A entrega é pelo menos uma vez: cada mensagem é marcada como enviada logo
+depois do envio, mas se o processo cair (ou o banco falhar) entre os dois,
+ela sai de novo. A chave vai para a entrega, que evita a duplicata quando
+consegue (o arquivo local sempre; no e-mail depende do destinatário).
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+
+from banco import execute_query, obter_config
+from mensagens import ErroPermanente, LimiteTaxa, montar_mensagem, obter_entregas
+from migracoes import manter_particoes
+
+logger = logging.getLogger("capitalpneus.mensageiro")
+
+# Lembretes de agendamentos que já passaram (mensageiro parado) não saem mais
+SQL_DESCARTAR_VENCIDOS = """
+    UPDATE mensagens_saida
+    SET status = 'descartada', ultimo_erro = 'agendamento já passou'
+    WHERE status = 'pendente' AND tipo = 'lembrete' AND enviar_em <= LOCALTIMESTAMP
+      AND (dados->>'data')::date < CURRENT_DATE
+"""
+
+SQL_RESERVAR_LOTE = """
+    UPDATE mensagens_saida m
+    SET enviar_em = LOCALTIMESTAMP + %(prazo)s * INTERVAL '1 second',
+        tentativas = m.tentativas + 1
+    FROM (
+        SELECT id FROM mensagens_saida
+        WHERE status = 'pendente' AND enviar_em <= LOCALTIMESTAMP
+        ORDER BY enviar_em
+        LIMIT %(lote)s
+        FOR UPDATE SKIP LOCKED
+    ) p
+    WHERE m.id = p.id
+    RETURNING m.id, m.chave, m.tipo, m.canal, m.destino, m.dados, m.tentativas
+"""
+
+# O resto do lote continua reservado por mais um prazo; sem isso outro
+# mensageiro pegaria de novo as mensagens que este ainda vai enviar
+SQL_RENOVAR_RESERVA = """
+    UPDATE mensagens_saida SET enviar_em = LOCALTIMESTAMP + %(prazo)s * INTERVAL '1 second'
+    WHERE id = ANY(%(ids)s) AND status = 'pendente'
+"""
+
+# Só se continua pendente: cancelada no meio do envio fica descartada
+SQL_MARCAR_ENVIADA = """
+    UPDATE mensagens_saida SET status = 'enviada', enviada_em = LOCALTIMESTAMP, ultimo_erro = NULL
+    WHERE id = %s AND status = 'pendente'
+"""
+
+SQL_MARCAR_FALHA = """
+    UPDATE mensagens_saida
+    SET status = CASE WHEN %(permanente)s OR tentativas >= %(maximo)s THEN 'falhou' ELSE 'pendente' END,
+        enviar_em = LOCALTIMESTAMP + LEAST(power(2, tentativas), %(espera_maxima)s) * INTERVAL '1 minute',
+        ultimo_erro = %(erro)s
+    WHERE id = %(id)s AND status = 'pendente'
+"""
+
+
+class Mensageiro:
+    """Reserva lotes de mensagens vencidas e entrega respeitando o limite de cada canal"""
+
+    def __init__(self, entregas, lote=50, prazo=300, tentativas=8, espera_maxima_min=360, por_minuto=60,
+                 particoes_a_cada_h=6):
+        self.entregas = entregas
+        self.lote = lote
+        self.prazo = prazo
+        self.tentativas = tentativas
+        self.espera_maxima_min = espera_maxima_min
+        self._limites = {canal: LimiteTaxa(por_minuto) for canal in entregas}
+        self.enviadas = 0
+        self.falhas = 0
+        self.particoes_a_cada = particoes_a_cada_h * 3600
+        self._proxima_manutencao = 0.0
+
+    def _entregar(self, mensagem):
+        dados = mensagem['dados']
+        if isinstance(dados, str):
+            dados = json.loads(dados)
+        assunto, texto = montar_mensagem(mensagem['tipo'], dados)
+        self._limites[mensagem['canal']].aguardar()
+        self.entregas[mensagem['canal']].enviar(
+            mensagem['chave'], mensagem['canal'], mensagem['destino'], assunto, texto
+        )
+
+    def _enviou(self, mensagem):
+        self.enviadas += 1
+        # Uma a uma, e não no fim do lote: uma queda no meio reenvia no
+        # máximo a mensagem que estava saindo. Se isto falhar, o prazo vence
+        # e ela sai de novo
+        _, erro = execute_query(SQL_MARCAR_ENVIADA, (mensagem['id'],), fetch=False, commit=True)
+        if erro:
+            logger.error("Falha ao marcar %s como enviada: %s", mensagem['chave'], erro)
+
+    def _falhou(self, mensagem, erro, permanente):
+        self.falhas += 1
+        logger.warning("Falha ao enviar %s (tentativa %s): %s", mensagem['chave'], mensagem['tentativas'], erro)
+        _, erro_banco = execute_query(SQL_MARCAR_FALHA, {
+            'id': mensagem['id'],
+            'erro': str(erro)[:1000],
+            'permanente': permanente,
+            'maximo': self.tentativas,
+            'espera_maxima': self.espera_maxima_min,
+        }, fetch=False, commit=True)
+        if erro_banco:
+            logger.error("Falha ao registrar erro de %s: %s", mensagem['chave'], erro_banco)
+
+    def _renovar_reserva(self, restantes):
+        _, erro = execute_query(
+            SQL_RENOVAR_RESERVA, {'prazo': self.prazo, 'ids': [m['id'] for m in restantes]},
+            fetch=False, commit=True,
+        )
+        if erro:
+            logger.error("Falha ao renovar a reserva de %s mensagens: %s", len(restantes), erro)
+
+    def processar_lote(self):
+        """Envia um lote; retorna quantas mensagens foram reservadas (None se o banco falhou)"""
+        execute_query(SQL_DESCARTAR_VENCIDOS, fetch=False, commit=True)
+        mensagens, erro = execute_query(
+            SQL_RESERVAR_LOTE, {'prazo': self.prazo, 'lote': self.lote}, fetch=True, commit=True
+        )
+        if erro:
+            logger.error("Falha ao reservar mensagens: %s", erro)
+            return None
+
+        renovar_em = time.monotonic() + self.prazo / 2
+        for posicao, mensagem in enumerate(mensagens):
+            if time.monotonic() >= renovar_em:
+                self._renovar_reserva(mensagens[posicao:])
+                renovar_em = time.monotonic() + self.prazo / 2
+            if mensagem['canal'] not in self.entregas:
+                self._falhou(mensagem, f"Canal sem entrega configurada: {mensagem['canal']}", True)
+                continue
+            try:
+                self._entregar(mensagem)
+            except ErroPermanente as e:
+                self._falhou(mensagem, e, True)
+            except Exception as e:
+                self._falhou(mensagem, e, False)
+            else:
+                self._enviou(mensagem)
+        return len(mensagens)
+
+    def manter_particoes(self):
+        """Manutenção das partições se já passou o intervalo; falha tenta de novo em 5 minutos"""
+        if time.monotonic() < self._proxima_manutencao:
+            return
+        try:
+            criadas, arquivadas = manter_particoes()
+        except Exception as e:
+            logger.error("Falha na manutenção das partições: %s", e)
+            self._proxima_manutencao = time.monotonic() + 300
+            return
+        if criadas or arquivadas:
+            logger.info("Partições criadas: %s; arquivadas: %s", criadas, arquivadas)
+        self._proxima_manutencao = time.monotonic() + self.particoes_a_cada
+
+    def executar(self, parar, intervalo):
+        """Até `parar` ser sinalizado; lote cheio emenda no próximo sem esperar"""
+        while not parar.is_set():
+            self.manter_particoes()
+            reservadas = self.processar_lote()
+            if reservadas is None or reservadas < self.lote:
+                parar.wait(intervalo)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uma-vez", action="store_true", help="envia o que estiver vencido e sai")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    mensageiro = Mensageiro(
+        obter_entregas(),
+        lote=int(obter_config("MENSAGENS_LOTE", 50)),
+        prazo=int(obter_config("MENSAGENS_PRAZO", 300)),
+        tentativas=int(obter_config("MENSAGENS_TENTATIVAS", 8)),
+        por_minuto=float(obter_config("MENSAGENS_POR_MINUTO", 60)),
+        particoes_a_cada_h=float(obter_config("PARTICOES_INTERVALO_H", 6)),
+    )
+
+    if args.uma_vez:
+        mensageiro.manter_particoes()
+        while mensageiro.processar_lote() == mensageiro.lote:
+            pass
+    else:
+        parar = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: parar.set())
+        signal.signal(signal.SIGINT, lambda *_: parar.set())
+        logger.info("Mensageiro iniciado")
+        mensageiro.executar(parar, float(obter_config("MENSAGENS_INTERVALO", 5)))
+
+    logger.info("Mensagens enviadas: %s, falhas: %s", mensageiro.enviadas, mensageiro.falhas)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
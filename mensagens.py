@@ -0,0 +1,149 @@
+"""Mensagens de confirmação e lembrete dos agendamentos.
+
+A reserva grava as mensagens na tabela mensagens_saida na mesma instrução
+do INSERT (repositorio_postgres.reservar); quem envia é o mensageiro.py,
+num processo separado. Nada aqui roda durante um rerun do Streamlit.
+"""
+import datetime
+import json
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from banco import obter_config
+
+CANAIS = ("email", "whatsapp", "sms")
+
+ASSUNTOS = {
+    'confirmacao': "Agendamento confirmado - Capital Pneus",
+    'lembrete': "Lembrete: seu agendamento é amanhã - Capital Pneus",
+}
+
+TEXTOS = {
+    'confirmacao': (
+        "Olá, {nome}! Seu agendamento de {servico} para o veículo {placa} "
+        "está confirmado para {data} às {hora}."
+    ),
+    'lembrete': (
+        "Olá, {nome}! Lembrete: amanhã, {data} às {hora}, você tem {servico} "
+        "agendado para o veículo {placa}. Até lá!"
+    ),
+}
+
+
+class ErroPermanente(Exception):
+    """Falha que não adianta tentar de novo (destino inválido, recusado)"""
+
+
+def canais_ativos():
+    """Canais em que as reservas geram mensagens (MENSAGENS_CANAIS, separados por vírgula)"""
+    configurados = str(obter_config("MENSAGENS_CANAIS", "email")).split(",")
+    return [c.strip() for c in configurados if c.strip() in CANAIS]
+
+
+def hora_lembrete():
+    """Horário do lembrete, no dia anterior ao agendamento"""
+    return obter_config("LEMBRETE_HORA", "18:00")
+
+
+def montar_mensagem(tipo, dados):
+    """(assunto, texto) a partir dos dados gravados junto com a mensagem"""
+    campos = dict(dados)
+    campos['data'] = datetime.date.fromisoformat(dados['data']).strftime('%d/%m/%Y')
+    campos['hora'] = dados['hora'][:5]
+    return ASSUNTOS[tipo], TEXTOS[tipo].format(**campos)
+
+
+class LimiteTaxa:
+    """No máximo `por_minuto` envios por minuto, espaçados igualmente"""
+
+    def __init__(self, por_minuto):
+        self._intervalo = 60.0 / por_minuto
+        self._proximo = 0.0
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        with self._trava:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self._intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+class EntregaArquivo:
+    """Substituto local dos provedores: uma linha JSON por mensagem.
+
+    Idempotente pela chave: uma mensagem reenviada (lote retomado depois de
+    uma queda do mensageiro) não é gravada duas vezes.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._entregues = set()
+        self._trava = threading.Lock()
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                self._entregues = {json.loads(linha)['chave'] for linha in arquivo if linha.strip()}
+
+    def enviar(self, chave, canal, destino, assunto, texto):
+        with self._trava:
+            if chave in self._entregues:
+                return
+            registro = {
+                'chave': chave, 'canal': canal, 'destino': destino, 'assunto': assunto, 'texto': texto,
+                'quando': datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._entregues.add(chave)
+
+
+class EntregaSmtp:
+    """E-mail por SMTP, sem garantia contra duplicatas.
+
+    O Message-ID vem da chave, então um reenvio (queda do mensageiro entre o
+    envio e a marcação) chega com o mesmo Message-ID; alguns servidores e
+    clientes de e-mail juntam as cópias, outros mostram as duas.
+    """
+
+    def __init__(self, host, porta, usuario, senha, remetente):
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.remetente = remetente
+
+    def enviar(self, chave, canal, destino, assunto, texto):
+        mensagem = EmailMessage()
+        mensagem['From'] = self.remetente
+        mensagem['To'] = destino
+        mensagem['Subject'] = assunto
+        mensagem['Message-ID'] = f"<{chave.replace(':', '.')}@{self.remetente.rpartition('@')[2] or 'localhost'}>"
+        mensagem.set_content(texto)
+        try:
+            with smtplib.SMTP(self.host, self.porta, timeout=30) as smtp:
+                smtp.starttls()
+                if self.usuario:
+                    smtp.login(self.usuario, self.senha)
+                smtp.send_message(mensagem)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise ErroPermanente(f"Destinatário recusado: {destino}") from e
+
+
+def obter_entregas():
+    """{canal: entrega}: SMTP para e-mail se SMTP_HOST estiver configurado;
+    o resto (WhatsApp e SMS ainda sem provedor) vai para o arquivo local"""
+    arquivo = EntregaArquivo(obter_config("MENSAGENS_ARQUIVO", "mensagens_enviadas.jsonl"))
+    entregas = {canal: arquivo for canal in CANAIS}
+    if obter_config("SMTP_HOST"):
+        entregas['email'] = EntregaSmtp(
+            host=obter_config("SMTP_HOST"),
+            porta=int(obter_config("SMTP_PORTA", 587)),
+            usuario=obter_config("SMTP_USUARIO"),
+            senha=obter_config("SMTP_SENHA"),
+            remetente=obter_config("SMTP_REMETENTE", "agendamentos@capitalpneus.com.br"),
+        )
+    return entregas
@@ -0,0 +1,194 @@
+"""Instrumentação das consultas: tempos por instrução e exportação Prometheus."""
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+logger = logging.getLogger("capitalpneus.sql")
+
+AMOSTRAS_POR_CONSULTA = 1024
+CONSULTAS_LENTAS_GUARDADAS = 50
+
+_LITERAIS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+@lru_cache(maxsize=512)
+def impressao_digital(query):
+    """SQL normalizado: sem literais, parâmetros nem espaços repetidos"""
+    texto = query if isinstance(query, str) else query.decode("utf-8", "replace")
+    for padrao, troca in _LITERAIS:
+        texto = padrao.sub(troca, texto)
+    return texto.strip()
+
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return 0.0
+    # Nearest-rank
+    indice = max(0, math.ceil(p / 100 * len(ordenadas)) - 1)
+    return ordenadas[indice]
+
+
+class EstatisticaConsulta:
+    __slots__ = ("chamadas", "erros", "linhas", "tempo_total", "aquisicao_total", "amostras")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.linhas = 0
+        self.tempo_total = 0.0
+        self.aquisicao_total = 0.0
+        # Janela das últimas execuções para os percentis
+        self.amostras = deque(maxlen=AMOSTRAS_POR_CONSULTA)
+
+
+class Metricas:
+    """Agregado por instrução, compartilhado por todas as sessões do processo"""
+
+    def __init__(self, limite_lento_ms):
+        self.limite_lento = limite_lento_ms / 1000
+        self.lentas = deque(maxlen=CONSULTAS_LENTAS_GUARDADAS)
+        self._consultas = {}
+        # grupo -> [execuções, tempo de parede, tempo se fosse sequencial]
+        self._paralelos = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, query, duracao, aquisicao, linhas, erro=None):
+        digital = impressao_digital(query)
+        with self._trava:
+            estatistica = self._consultas.get(digital)
+            if estatistica is None:
+                estatistica = self._consultas[digital] = EstatisticaConsulta()
+            estatistica.chamadas += 1
+            estatistica.erros += erro is not None
+            estatistica.linhas += max(linhas or 0, 0)
+            estatistica.tempo_total += duracao
+            estatistica.aquisicao_total += aquisicao
+            estatistica.amostras.append(duracao)
+            if duracao >= self.limite_lento:
+                self.lentas.append((time.time(), duracao, digital))
+
+        if duracao >= self.limite_lento:
+            logger.warning("Consulta lenta (%.0f ms, aquisição %.0f ms): %s", duracao * 1000, aquisicao * 1000, digital)
+
+    def registrar_paralelo(self, grupo, parede, sequencial):
+        """Leituras disparadas juntas: quanto levaram e quanto levariam uma após a outra"""
+        with self._trava:
+            totais = self._paralelos.setdefault(grupo, [0, 0.0, 0.0])
+            totais[0] += 1
+            totais[1] += parede
+            totais[2] += sequencial
+
+    def paralelos(self):
+        with self._trava:
+            itens = [(grupo, *totais) for grupo, totais in self._paralelos.items()]
+        return [
+            {
+                'grupo': grupo,
+                'execucoes': execucoes,
+                'parede_s': parede,
+                'sequencial_s': sequencial,
+                'parede_media_ms': parede / execucoes * 1000,
+                'sequencial_media_ms': sequencial / execucoes * 1000,
+                'economia_s': sequencial - parede,
+            }
+            for grupo, execucoes, parede, sequencial in sorted(itens)
+        ]
+
+    def zerar(self):
+        with self._trava:
+            self._consultas.clear()
+            self._paralelos.clear()
+            self.lentas.clear()
+
+    def resumo(self):
+        """Uma linha por instrução, da que mais consumiu tempo para a que menos"""
+        with self._trava:
+            itens = [(d, e.chamadas, e.erros, e.linhas, e.tempo_total, e.aquisicao_total, sorted(e.amostras))
+                     for d, e in self._consultas.items()]
+
+        linhas = []
+        for digital, chamadas, erros, qtd_linhas, total, aquisicao, ordenadas in itens:
+            linhas.append({
+                'id': hashlib.sha1(digital.encode()).hexdigest()[:8],
+                'consulta': digital,
+                'chamadas': chamadas,
+                'erros': erros,
+                'linhas': qtd_linhas,
+                'linhas_por_chamada': qtd_linhas / chamadas,
+                'p50_ms': _percentil(ordenadas, 50) * 1000,
+                'p95_ms': _percentil(ordenadas, 95) * 1000,
+                'p99_ms': _percentil(ordenadas, 99) * 1000,
+                'aquisicao_s': aquisicao,
+                'aquisicao_media_ms': aquisicao / chamadas * 1000,
+                'total_s': total,
+            })
+        linhas.sort(key=lambda l: l['total_s'], reverse=True)
+        return linhas
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus"""
+        saida = [
+            "# HELP capital_sql_duracao_segundos Tempo de parede por instrução SQL",
+            "# TYPE capital_sql_duracao_segundos summary",
+        ]
+        resumo = self.resumo()
+        for l in resumo:
+            rotulos = f'id="{l["id"]}",consulta="{_escapar_rotulo(l["consulta"][:200])}"'
+            for q, chave in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                saida.append(f'capital_sql_duracao_segundos{{{rotulos},quantile="{q}"}} {l[chave] / 1000:.6f}')
+            saida.append(f"capital_sql_duracao_segundos_sum{{{rotulos}}} {l['total_s']:.6f}")
+            saida.append(f"capital_sql_duracao_segundos_count{{{rotulos}}} {l['chamadas']}")
+
+        for nome, ajuda, chave in (
+            ("capital_sql_aquisicao_segundos_total", "Tempo esperando conexão do pool", 'aquisicao_s'),
+            ("capital_sql_linhas_total", "Linhas retornadas ou afetadas", 'linhas'),
+            ("capital_sql_erros_total", "Execuções que terminaram em erro", 'erros'),
+        ):
+            saida.append(f"# HELP {nome} {ajuda}")
+            saida.append(f"# TYPE {nome} counter")
+            for l in resumo:
+                saida.append(f'{nome}{{id="{l["id"]}"}} {l[chave]:g}')
+
+        paralelos = self.paralelos()
+        for nome, ajuda, chave in (
+            ("capital_paralelo_parede_segundos_total", "Tempo das leituras disparadas em paralelo", 'parede_s'),
+            ("capital_paralelo_sequencial_segundos_total", "Tempo que as mesmas leituras levariam em sequência", 'sequencial_s'),
+        ):
+            saida.append(f"# HELP {nome} {ajuda}")
+            saida.append(f"# TYPE {nome} counter")
+            for p in paralelos:
+                saida.append(f'{nome}{{grupo="{_escapar_rotulo(p["grupo"])}"}} {p[chave]:.6f}')
+        return "\n".join(saida) + "\n"
+
+
+def _escapar_rotulo(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def exportar_periodicamente(metricas, caminho, intervalo=15):
+    """Grava o texto Prometheus em `caminho` (coletor textfile do node_exporter)"""
+    def gravar():
+        while True:
+            time.sleep(intervalo)
+            try:
+                temporario = f"{caminho}.{os.getpid()}.tmp"
+                with open(temporario, "w", encoding="utf-8") as arquivo:
+                    arquivo.write(metricas.prometheus())
+                os.replace(temporario, caminho)
+            except OSError:
+                logger.exception("Falha ao gravar métricas em %s", caminho)
+
+    thread = threading.Thread(target=gravar, name="exportar-metricas", daemon=True)
+    thread.start()
+    return thread
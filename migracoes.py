@@ -0,0 +1,630 @@
+"""Migrações versionadas do schema.
+
+O app nunca faz DDL: com migração pendente ele só mostra o erro. Aplicar
+antes do deploy com:
+
+    python migracoes.py              # aplica as pendentes
+    python migracoes.py --status     # mostra versão atual e pendentes
+    python migracoes.py --particoes  # cria as próximas partições e arquiva as antigas
+
+A manutenção das partições é DDL (e DETACH trava a tabela de
+agendamentos): nunca roda dentro do app. Quem a executa é o mensageiro.py,
+a cada PARTICOES_INTERVALO_H horas; sem o mensageiro, agendar no cron:
+
+    15 3 * * *  python migracoes.py --particoes
+
+Se mesmo assim faltar a partição de um mês, a reserva cai na partição
+padrão (agendamentos_padrao), e a próxima manutenção a move para o mês.
+"""
+import sys
+
+import streamlit as st
+
+from banco import conexao, execute_query, obter_config, transacao
+
+# Chave do advisory lock que serializa migrações entre processos/servidores
+TRAVA_MIGRACOES = 48_151_623
+
+# Idem para a manutenção das partições de agendamentos
+TRAVA_PARTICOES = 48_151_625
+
+class SchemaDesatualizado(Exception):
+    """O banco está atrás de MIGRACOES; o app não migra sozinho"""
+
+
+# (versão, descrição, SQL) - sempre em ordem crescente, nunca editar uma já aplicada
+MIGRACOES = [
+    (1, "tabelas iniciais", """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            nome VARCHAR(255) NOT NULL,
+            telefone VARCHAR(20),
+            provider VARCHAR(50),
+            provider_id VARCHAR(255),
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS veiculos_usuario (
+            id SERIAL PRIMARY KEY,
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            placa VARCHAR(8) NOT NULL,
+            modelo VARCHAR(255) NOT NULL,
+            ano INTEGER,
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS agendamentos (
+            id SERIAL PRIMARY KEY,
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            veiculo_id INTEGER NOT NULL REFERENCES veiculos_usuario(id),
+            data_agendamento DATE NOT NULL,
+            hora_agendamento TIME NOT NULL,
+            servico VARCHAR(100) NOT NULL,
+            status VARCHAR(50) DEFAULT 'confirmado',
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    (2, "horário confirmado único", """
+        -- Duplicatas antigas (de antes da garantia) ficam com o agendamento mais antigo
+        UPDATE agendamentos a SET status = 'cancelado'
+        FROM agendamentos b
+        WHERE a.status = 'confirmado' AND b.status = 'confirmado'
+          AND a.data_agendamento = b.data_agendamento
+          AND a.hora_agendamento = b.hora_agendamento
+          AND a.id > b.id;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS agendamentos_horario_confirmado_uniq
+            ON agendamentos (data_agendamento, hora_agendamento)
+            WHERE status = 'confirmado';
+    """),
+    (3, "boxes e duração do serviço", """
+        CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+        ALTER TABLE agendamentos
+            ADD COLUMN IF NOT EXISTS box SMALLINT NOT NULL DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS duracao_min SMALLINT NOT NULL DEFAULT 20;
+
+        -- Com vários boxes e durações diferentes, a garantia passa a ser
+        -- "nenhum box com dois serviços confirmados sobrepostos"
+        DROP INDEX IF EXISTS agendamentos_horario_confirmado_uniq;
+
+        ALTER TABLE agendamentos ADD CONSTRAINT agendamentos_box_sem_sobreposicao
+            EXCLUDE USING gist (
+                data_agendamento WITH =,
+                box WITH =,
+                tsrange(
+                    data_agendamento + hora_agendamento,
+                    data_agendamento + hora_agendamento + duracao_min * INTERVAL '1 minute'
+                ) WITH &&
+            ) WHERE (status = 'confirmado');
+    """),
+    (4, "calendário comercial", """
+        CREATE TABLE IF NOT EXISTS horario_funcionamento (
+            dia_semana SMALLINT PRIMARY KEY CHECK (dia_semana BETWEEN 0 AND 6),
+            abertura TIME,
+            fechamento TIME,
+            CHECK ((abertura IS NULL) = (fechamento IS NULL) AND (abertura IS NULL OR abertura <= fechamento))
+        );
+
+        -- 0 = segunda (datetime.weekday); sem horário = fechado
+        INSERT INTO horario_funcionamento (dia_semana, abertura, fechamento) VALUES
+            (0, '08:00', '17:30'), (1, '08:00', '17:30'), (2, '08:00', '17:30'),
+            (3, '08:00', '17:30'), (4, '08:00', '17:30'), (5, '08:00', '12:00'),
+            (6, NULL, NULL)
+        ON CONFLICT (dia_semana) DO NOTHING;
+
+        -- Feriados (sem horário) e expedientes especiais
+        CREATE TABLE IF NOT EXISTS calendario_excecoes (
+            data DATE PRIMARY KEY,
+            abertura TIME,
+            fechamento TIME,
+            descricao VARCHAR(255) NOT NULL,
+            CHECK ((abertura IS NULL) = (fechamento IS NULL) AND (abertura IS NULL OR abertura <= fechamento))
+        );
+    """),
+    (5, "índices da lista do admin", """
+        -- Ordem da paginação por chave (data, hora, id) dos confirmados
+        CREATE INDEX IF NOT EXISTS agendamentos_confirmados_ordem_idx
+            ON agendamentos (data_agendamento, hora_agendamento, id)
+            WHERE status = 'confirmado';
+
+        CREATE INDEX IF NOT EXISTS agendamentos_confirmados_servico_idx
+            ON agendamentos (servico, data_agendamento, hora_agendamento, id)
+            WHERE status = 'confirmado';
+
+        -- Busca por prefixo de placa: upper(placa) LIKE 'ABC%'
+        CREATE INDEX IF NOT EXISTS veiculos_placa_prefixo_idx
+            ON veiculos_usuario (upper(placa) text_pattern_ops);
+    """),
+    (6, "índices da busca para cancelar", """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+        -- nome ILIKE '%joão%'
+        CREATE INDEX IF NOT EXISTS usuarios_nome_trgm_idx
+            ON usuarios USING gin (nome gin_trgm_ops);
+
+        -- Só os dígitos do telefone, por prefixo
+        CREATE INDEX IF NOT EXISTS usuarios_telefone_digitos_idx
+            ON usuarios (regexp_replace(telefone, '[^0-9]', '', 'g') text_pattern_ops);
+
+        -- Dos usuários/veículos encontrados para os agendamentos deles
+        CREATE INDEX IF NOT EXISTS agendamentos_usuario_idx
+            ON agendamentos (usuario_id, data_agendamento);
+        CREATE INDEX IF NOT EXISTS agendamentos_veiculo_idx
+            ON agendamentos (veiculo_id);
+    """),
+    (7, "estatísticas diárias incrementais", """
+        CREATE TABLE IF NOT EXISTS estatisticas_diarias (
+            data DATE NOT NULL,
+            servico VARCHAR(100) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            minutos INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (data, servico, status)
+        );
+
+        CREATE TABLE IF NOT EXISTS contadores (
+            nome VARCHAR(50) PRIMARY KEY,
+            valor BIGINT NOT NULL DEFAULT 0
+        );
+
+        CREATE OR REPLACE FUNCTION estatisticas_agendamento() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO estatisticas_diarias AS e (data, servico, status, quantidade, minutos)
+                VALUES (OLD.data_agendamento, OLD.servico, COALESCE(OLD.status, ''), -1, -OLD.duracao_min)
+                ON CONFLICT (data, servico, status) DO UPDATE
+                SET quantidade = e.quantidade + EXCLUDED.quantidade, minutos = e.minutos + EXCLUDED.minutos;
+
+                IF OLD.status = 'confirmado' THEN
+                    UPDATE contadores SET valor = valor - 1 WHERE nome = 'agendamentos_confirmados';
+                END IF;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO estatisticas_diarias AS e (data, servico, status, quantidade, minutos)
+                VALUES (NEW.data_agendamento, NEW.servico, COALESCE(NEW.status, ''), 1, NEW.duracao_min)
+                ON CONFLICT (data, servico, status) DO UPDATE
+                SET quantidade = e.quantidade + EXCLUDED.quantidade, minutos = e.minutos + EXCLUDED.minutos;
+
+                IF NEW.status = 'confirmado' THEN
+                    UPDATE contadores SET valor = valor + 1 WHERE nome = 'agendamentos_confirmados';
+                END IF;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION contador_usuarios() RETURNS trigger AS $$
+        BEGIN
+            UPDATE contadores SET valor = valor + CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END
+            WHERE nome = 'usuarios';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Os gatilhos bloqueiam escritas até o commit, então a carga
+        -- inicial abaixo é consistente com eles
+        CREATE TRIGGER agendamentos_estatisticas
+            AFTER INSERT OR DELETE OR UPDATE OF status, data_agendamento, servico, duracao_min
+            ON agendamentos
+            FOR EACH ROW EXECUTE FUNCTION estatisticas_agendamento();
+
+        CREATE TRIGGER usuarios_contador
+            AFTER INSERT OR DELETE ON usuarios
+            FOR EACH ROW EXECUTE FUNCTION contador_usuarios();
+
+        INSERT INTO estatisticas_diarias (data, servico, status, quantidade, minutos)
+        SELECT data_agendamento, servico, COALESCE(status, ''), COUNT(*), SUM(duracao_min)
+        FROM agendamentos
+        GROUP BY 1, 2, 3;
+
+        INSERT INTO contadores (nome, valor) VALUES
+            ('usuarios', (SELECT COUNT(*) FROM usuarios)),
+            ('agendamentos_confirmados', (SELECT COUNT(*) FROM agendamentos WHERE status = 'confirmado'))
+        ON CONFLICT (nome) DO UPDATE SET valor = EXCLUDED.valor;
+    """),
+    (8, "índices das consultas quentes", """
+        -- Lista de veículos do usuário (agendamento e Meus Veículos) e FK
+        CREATE INDEX IF NOT EXISTS veiculos_usuario_idx
+            ON veiculos_usuario (usuario_id, data_criacao DESC);
+
+        -- Ocupação por data e janela de 30 dias, sem visitar a tabela
+        CREATE INDEX IF NOT EXISTS agendamentos_ocupacao_idx
+            ON agendamentos (data_agendamento)
+            INCLUDE (hora_agendamento, box, duracao_min)
+            WHERE status = 'confirmado';
+    """),
+    (9, "índice do histórico paginado", """
+        -- Paginação por chave (data, hora, id) decrescente do histórico;
+        -- também atende a busca de agendamentos a partir do usuário
+        CREATE INDEX IF NOT EXISTS agendamentos_usuario_historico_idx
+            ON agendamentos (usuario_id, data_agendamento DESC, hora_agendamento DESC, id DESC);
+
+        DROP INDEX IF EXISTS agendamentos_usuario_idx;
+    """),
+    (10, "notificações de alteração para os caches", """
+        -- Cada processo do app escuta estes canais (notificacoes.py) e
+        -- descarta só a data afetada; notificações iguais na mesma transação
+        -- são entregues uma vez
+        CREATE OR REPLACE FUNCTION notificar_agendamento() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM pg_notify('agendamentos_alterados', OLD.data_agendamento::text);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM pg_notify('agendamentos_alterados', NEW.data_agendamento::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION notificar_calendario() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('calendario_alterado', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS agendamentos_notificar ON agendamentos;
+        CREATE TRIGGER agendamentos_notificar
+            AFTER INSERT OR DELETE OR UPDATE OF status, data_agendamento, hora_agendamento, box, duracao_min
+            ON agendamentos
+            FOR EACH ROW EXECUTE FUNCTION notificar_agendamento();
+
+        DROP TRIGGER IF EXISTS calendario_excecoes_notificar ON calendario_excecoes;
+        CREATE TRIGGER calendario_excecoes_notificar
+            AFTER INSERT OR UPDATE OR DELETE ON calendario_excecoes
+            FOR EACH STATEMENT EXECUTE FUNCTION notificar_calendario();
+
+        DROP TRIGGER IF EXISTS horario_funcionamento_notificar ON horario_funcionamento;
+        CREATE TRIGGER horario_funcionamento_notificar
+            AFTER INSERT OR UPDATE OR DELETE ON horario_funcionamento
+            FOR EACH STATEMENT EXECUTE FUNCTION notificar_calendario();
+    """),
+    (11, "agendamentos particionados por mês", """
+        -- A tabela só cresce: com partições mensais as consultas por data
+        -- leem só os meses envolvidos, e os meses antigos saem inteiros para
+        -- agendamentos_arquivo (manter_particoes), sem DELETE em massa
+        ALTER TABLE agendamentos RENAME TO agendamentos_antiga;
+
+        CREATE TABLE agendamentos (
+            id INTEGER NOT NULL DEFAULT nextval('agendamentos_id_seq'),
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            veiculo_id INTEGER NOT NULL REFERENCES veiculos_usuario(id),
+            data_agendamento DATE NOT NULL,
+            hora_agendamento TIME NOT NULL,
+            servico VARCHAR(100) NOT NULL,
+            status VARCHAR(50) DEFAULT 'confirmado',
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            box SMALLINT NOT NULL DEFAULT 1,
+            duracao_min SMALLINT NOT NULL DEFAULT 20,
+            -- A chave de partição precisa fazer parte da chave primária
+            PRIMARY KEY (id, data_agendamento)
+        ) PARTITION BY RANGE (data_agendamento);
+
+        -- Mesmas colunas; recebe as partições que passaram da retenção
+        CREATE TABLE agendamentos_arquivo (
+            LIKE agendamentos,
+            PRIMARY KEY (id, data_agendamento)
+        ) PARTITION BY RANGE (data_agendamento);
+
+        CREATE INDEX agendamentos_arquivo_usuario_historico_idx
+            ON agendamentos_arquivo (usuario_id, data_agendamento DESC, hora_agendamento DESC, id DESC);
+
+        -- Restrição de exclusão não existe em tabela particionada (até o
+        -- PostgreSQL 17): vai em cada partição, o que basta porque ela só
+        -- compara agendamentos do mesmo dia
+        CREATE OR REPLACE FUNCTION criar_particao_agendamentos(mes DATE) RETURNS TEXT AS $$
+        DECLARE
+            inicio DATE := date_trunc('month', mes);
+            nome TEXT := 'agendamentos_' || to_char(inicio, 'YYYY_MM');
+        BEGIN
+            IF to_regclass(nome) IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF agendamentos FOR VALUES FROM (%L) TO (%L)',
+                nome, inicio, (inicio + INTERVAL '1 month')::date
+            );
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist ('
+                '    data_agendamento WITH =, box WITH =,'
+                '    tsrange(data_agendamento + hora_agendamento,'
+                '            data_agendamento + hora_agendamento + duracao_min * INTERVAL ''1 minute'') WITH &&'
+                ') WHERE (status = ''confirmado'')',
+                nome, nome || '_box_sem_sobreposicao'
+            );
+            RETURN nome;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Do mês atual até meses_a_frente; retorna as partições criadas
+        CREATE OR REPLACE FUNCTION criar_particoes_agendamentos(meses_a_frente INTEGER) RETURNS SETOF TEXT AS $$
+            SELECT nome
+            FROM generate_series(
+                date_trunc('month', CURRENT_DATE),
+                date_trunc('month', CURRENT_DATE) + meses_a_frente * INTERVAL '1 month',
+                INTERVAL '1 month'
+            ) AS m,
+            LATERAL criar_particao_agendamentos(m::date) AS nome
+            WHERE nome IS NOT NULL;
+        $$ LANGUAGE sql;
+
+        -- Move para o arquivo os meses anteriores aos últimos meses_retencao;
+        -- os gatilhos clonados da tabela principal saem junto no DETACH
+        CREATE OR REPLACE FUNCTION arquivar_agendamentos(meses_retencao INTEGER) RETURNS SETOF TEXT AS $$
+        DECLARE
+            limite DATE := date_trunc('month', CURRENT_DATE) - meses_retencao * INTERVAL '1 month';
+            particao RECORD;
+        BEGIN
+            FOR particao IN
+                SELECT c.relname AS nome, to_date(substr(c.relname, 14), 'YYYY_MM') AS inicio
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'agendamentos'::regclass
+                  AND c.relname ~ '^agendamentos_[0-9]{4}_[0-9]{2}$'
+                ORDER BY c.relname
+            LOOP
+                CONTINUE WHEN particao.inicio >= limite;
+                EXECUTE format('ALTER TABLE agendamentos DETACH PARTITION %I', particao.nome);
+                EXECUTE format(
+                    'ALTER TABLE agendamentos_arquivo ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    particao.nome, particao.inicio, (particao.inicio + INTERVAL '1 month')::date
+                );
+                RETURN NEXT particao.nome;
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Um mês para cada mês com dados e os próximos três
+        SELECT criar_particao_agendamentos(m::date)
+        FROM generate_series(
+            date_trunc('month', LEAST(CURRENT_DATE, (SELECT MIN(data_agendamento) FROM agendamentos_antiga))),
+            date_trunc('month', GREATEST(
+                CURRENT_DATE + INTERVAL '3 months',
+                (SELECT MAX(data_agendamento) FROM agendamentos_antiga)
+            )),
+            INTERVAL '1 month'
+        ) AS m;
+
+        -- Antes dos gatilhos: estatísticas e contadores já contam estas linhas
+        INSERT INTO agendamentos SELECT * FROM agendamentos_antiga;
+
+        ALTER SEQUENCE agendamentos_id_seq OWNED BY agendamentos.id;
+        DROP TABLE agendamentos_antiga;
+
+        CREATE INDEX agendamentos_confirmados_ordem_idx
+            ON agendamentos (data_agendamento, hora_agendamento, id)
+            WHERE status = 'confirmado';
+        CREATE INDEX agendamentos_confirmados_servico_idx
+            ON agendamentos (servico, data_agendamento, hora_agendamento, id)
+            WHERE status = 'confirmado';
+        CREATE INDEX agendamentos_veiculo_idx
+            ON agendamentos (veiculo_id);
+        CREATE INDEX agendamentos_ocupacao_idx
+            ON agendamentos (data_agendamento)
+            INCLUDE (hora_agendamento, box, duracao_min)
+            WHERE status = 'confirmado';
+        CREATE INDEX agendamentos_usuario_historico_idx
+            ON agendamentos (usuario_id, data_agendamento DESC, hora_agendamento DESC, id DESC);
+
+        CREATE TRIGGER agendamentos_estatisticas
+            AFTER INSERT OR DELETE OR UPDATE OF status, data_agendamento, servico, duracao_min
+            ON agendamentos
+            FOR EACH ROW EXECUTE FUNCTION estatisticas_agendamento();
+
+        CREATE TRIGGER agendamentos_notificar
+            AFTER INSERT OR DELETE OR UPDATE OF status, data_agendamento, hora_agendamento, box, duracao_min
+            ON agendamentos
+            FOR EACH ROW EXECUTE FUNCTION notificar_agendamento();
+
+        ANALYZE agendamentos;
+    """),
+    (12, "caixa de saída de mensagens", """
+        -- Gravada na mesma instrução da reserva; o mensageiro.py entrega.
+        -- A chave (tipo:canal:agendamento) impede mensagens duplicadas e
+        -- acompanha o envio para o destino descartar reenvios
+        CREATE TABLE IF NOT EXISTS mensagens_saida (
+            id BIGSERIAL PRIMARY KEY,
+            chave VARCHAR(100) NOT NULL UNIQUE,
+            tipo VARCHAR(20) NOT NULL,
+            canal VARCHAR(20) NOT NULL,
+            destino VARCHAR(255) NOT NULL,
+            agendamento_id INTEGER,
+            dados JSONB NOT NULL DEFAULT '{}',
+            status VARCHAR(20) NOT NULL DEFAULT 'pendente',
+            enviar_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            tentativas SMALLINT NOT NULL DEFAULT 0,
+            ultimo_erro TEXT,
+            criada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            enviada_em TIMESTAMP
+        );
+
+        -- A fila: pendentes por horário de envio
+        CREATE INDEX IF NOT EXISTS mensagens_saida_fila_idx
+            ON mensagens_saida (enviar_em)
+            WHERE status = 'pendente';
+
+        -- Cancelar o agendamento descarta o que ainda não saiu
+        CREATE INDEX IF NOT EXISTS mensagens_saida_agendamento_idx
+            ON mensagens_saida (agendamento_id)
+            WHERE status = 'pendente';
+    """),
+    (13, "partição padrão de agendamentos", """
+        -- Rede de segurança: se a manutenção (mensageiro.py) parar, as
+        -- reservas de um mês sem partição caem aqui em vez de falhar
+        CREATE TABLE agendamentos_padrao PARTITION OF agendamentos DEFAULT;
+
+        ALTER TABLE agendamentos_padrao ADD CONSTRAINT agendamentos_padrao_box_sem_sobreposicao EXCLUDE USING gist (
+            data_agendamento WITH =, box WITH =,
+            tsrange(data_agendamento + hora_agendamento,
+                    data_agendamento + hora_agendamento + duracao_min * INTERVAL '1 minute') WITH &&
+        ) WHERE (status = 'confirmado');
+
+        -- Com a partição padrão, criar um mês que já tem linhas nela falharia:
+        -- elas saem da padrão antes e entram de novo depois, já no mês novo
+        CREATE OR REPLACE FUNCTION criar_particao_agendamentos(mes DATE) RETURNS TEXT AS $$
+        DECLARE
+            inicio DATE := date_trunc('month', mes);
+            fim DATE := (date_trunc('month', mes) + INTERVAL '1 month')::date;
+            nome TEXT := 'agendamentos_' || to_char(inicio, 'YYYY_MM');
+        BEGIN
+            IF to_regclass(nome) IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+            CREATE TEMP TABLE agendamentos_sem_particao (LIKE agendamentos) ON COMMIT DROP;
+            WITH movidas AS (
+                DELETE FROM agendamentos_padrao
+                WHERE data_agendamento >= inicio AND data_agendamento < fim
+                RETURNING *
+            )
+            INSERT INTO agendamentos_sem_particao SELECT * FROM movidas;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF agendamentos FOR VALUES FROM (%L) TO (%L)',
+                nome, inicio, fim
+            );
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist ('
+                '    data_agendamento WITH =, box WITH =,'
+                '    tsrange(data_agendamento + hora_agendamento,'
+                '            data_agendamento + hora_agendamento + duracao_min * INTERVAL ''1 minute'') WITH &&'
+                ') WHERE (status = ''confirmado'')',
+                nome, nome || '_box_sem_sobreposicao'
+            );
+            INSERT INTO agendamentos SELECT * FROM agendamentos_sem_particao;
+            DROP TABLE agendamentos_sem_particao;
+            RETURN nome;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+]
+
+SQL_SCHEMA_VERSION = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        versao INTEGER PRIMARY KEY,
+        descricao VARCHAR(255) NOT NULL,
+        aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def versao_atual():
+    """Versão do schema no banco (0 se nunca migrado); banco fora do ar é exceção"""
+    existe, erro = execute_query("SELECT to_regclass('schema_version') IS NOT NULL AS existe")
+    if erro:
+        raise RuntimeError(erro)
+    if not existe[0]['existe']:
+        return 0
+    resultado, erro = execute_query("SELECT COALESCE(MAX(versao), 0) AS versao FROM schema_version")
+    if erro:
+        raise RuntimeError(erro)
+    return resultado[0]['versao']
+
+
+def migracoes_pendentes():
+    """Migrações ainda não aplicadas, em ordem"""
+    atual = versao_atual()
+    return [m for m in MIGRACOES if m[0] > atual]
+
+
+def aplicar_migracoes():
+    """Aplica as migrações pendentes; retorna as versões aplicadas"""
+    aplicadas = []
+    with conexao() as conn:
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            for versao, descricao, sql in MIGRACOES:
+                # Uma transação por passo; o lock de transação funciona
+                # também atrás do pooler do Neon (modo transação)
+                try:
+                    cur.execute("SELECT pg_advisory_xact_lock(%s)", (TRAVA_MIGRACOES,))
+                    cur.execute(SQL_SCHEMA_VERSION)
+                    cur.execute("SELECT 1 FROM schema_version WHERE versao = %s", (versao,))
+                    if cur.fetchone() is None:
+                        cur.execute(sql)
+                        cur.execute(
+                            "INSERT INTO schema_version (versao, descricao) VALUES (%s, %s)",
+                            (versao, descricao),
+                        )
+                        aplicadas.append(versao)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+    return aplicadas
+
+
+@st.cache_resource
+def verificar_schema():
+    """Confere a versão do schema, sem DDL; fica em cache só quando está em dia.
+
+    Exceção não vai para o cache: enquanto houver migração pendente, cada
+    rerun confere de novo, e o app volta sozinho depois do 'python migracoes.py'.
+    """
+    atual, esperada = versao_atual(), MIGRACOES[-1][0]
+    if atual < esperada:
+        raise SchemaDesatualizado(
+            f"Schema desatualizado (versão {atual}, esperada {esperada}): execute 'python migracoes.py'"
+        )
+    return atual
+
+
+def manter_particoes():
+    """Cria as partições dos próximos meses e arquiva as que passaram da retenção.
+
+    Retorna (criadas, arquivadas). DETACH trava a tabela de agendamentos,
+    então desiste rápido (lock_timeout) se houver transação longa em curso;
+    a próxima execução tenta de novo.
+    """
+    meses_a_frente = int(obter_config("AGENDAMENTOS_MESES_A_FRENTE", 3))
+    retencao = int(obter_config("AGENDAMENTOS_RETENCAO_MESES", 24))
+    with transacao("manter partições de agendamentos") as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (TRAVA_PARTICOES,))
+        cur.execute("SET LOCAL lock_timeout = '5s'")
+        cur.execute("SELECT criar_particoes_agendamentos(%s) AS nome", (meses_a_frente,))
+        criadas = [row['nome'] for row in cur.fetchall()]
+        arquivadas = []
+        # 0 desliga o arquivamento
+        if retencao > 0:
+            cur.execute("SELECT arquivar_agendamentos(%s) AS nome", (retencao,))
+            arquivadas = [row['nome'] for row in cur.fetchall()]
+    return criadas, arquivadas
+
+
+def main(argv):
+    if "--particoes" in argv:
+        criadas, arquivadas = manter_particoes()
+        print("Partições criadas: " + (", ".join(criadas) or "nenhuma"))
+        print("Partições arquivadas: " + (", ".join(arquivadas) or "nenhuma"))
+        return 0
+
+    if "--status" in argv:
+        pendentes = migracoes_pendentes()
+        print(f"Versão atual: {versao_atual()}")
+        for versao, descricao, _ in pendentes:
+            print(f"Pendente: {versao} - {descricao}")
+        if not pendentes:
+            print("Nenhuma migração pendente")
+        ultima, erro = execute_query("""
+            SELECT max(c.relname) AS nome
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass('agendamentos')
+              AND c.relname ~ '^agendamentos_[0-9]{4}_[0-9]{2}$'
+        """)
+        if not erro and ultima and ultima[0]['nome']:
+            print(f"Última partição de agendamentos: {ultima[0]['nome']}")
+        return 0
+
+    aplicadas = aplicar_migracoes()
+    if aplicadas:
+        print("Migrações aplicadas: " + ", ".join(str(v) for v in aplicadas))
+    else:
+        print("Nenhuma migração pendente")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,124 @@
+"""Motor de horários: boxes, duração por serviço e ocupação em bitmap.
+
+Cada dia tem uma grade de horários de início (de 20 em 20 minutos),
+definida pelo calendário (calendario.py). A ocupação de cada box é um
+inteiro em que o bit i indica o horário i ocupado; um serviço de k
+horários cabe a partir de i num box se os bits i..i+k-1 estão livres, o
+que se resolve com deslocamentos e ANDs.
+"""
+from collections import namedtuple
+
+INTERVALO_MIN = 20
+
+# Duração de cada serviço oferecido (minutos); a ordem é a do formulário
+DURACAO_SERVICOS = {
+    "Troca de Pneus": 40,
+    "Manutenção": 60,
+    "Alinhamento": 40,
+    "Balanceamento": 20,
+    "Outro": 20,
+}
+SERVICOS = list(DURACAO_SERVICOS)
+
+
+def minutos(hora):
+    """'HH:MM' ou datetime.time -> minutos desde meia-noite"""
+    if isinstance(hora, str):
+        return int(hora[:2]) * 60 + int(hora[3:5])
+    return hora.hour * 60 + hora.minute
+
+
+def formatar_minutos(total):
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def duracao_servico(servico):
+    return DURACAO_SERVICOS.get(servico, INTERVALO_MIN)
+
+
+def horarios_do_servico(servico):
+    """Quantos horários consecutivos da grade o serviço ocupa"""
+    return max(1, -(-duracao_servico(servico) // INTERVALO_MIN))
+
+
+class ModeloDia(namedtuple("ModeloDia", "inicio_min quantidade horarios")):
+    """Grade imutável de horários de início de um dia"""
+
+    __slots__ = ()
+
+    @classmethod
+    def criar(cls, inicio, fim):
+        inicio_min, fim_min = minutos(inicio), minutos(fim)
+        horarios = tuple(formatar_minutos(m) for m in range(inicio_min, fim_min + 1, INTERVALO_MIN))
+        return cls(inicio_min, len(horarios), horarios)
+
+
+FECHADO = ModeloDia(0, 0, ())
+
+
+class OcupacaoDia:
+    """Ocupação de um dia: um inteiro por box, bit i = horário i ocupado"""
+
+    __slots__ = ("modelo", "mapas")
+
+    def __init__(self, modelo, mapas):
+        self.modelo = modelo
+        self.mapas = tuple(mapas)
+
+    @classmethod
+    def montar(cls, modelo, boxes, reservas):
+        """reservas: iterável de (hora, box, duracao_min) confirmados"""
+        mapas = [0] * boxes
+        for hora, box, duracao_min in reservas:
+            # Box desativado depois de agendado: não conta na capacidade atual
+            if not 1 <= box <= boxes:
+                continue
+            inicio = minutos(hora) - modelo.inicio_min
+            primeiro = max(inicio // INTERVALO_MIN, 0)
+            ultimo = min(-(-(inicio + duracao_min) // INTERVALO_MIN), modelo.quantidade)
+            if ultimo > primeiro:
+                mapas[box - 1] |= ((1 << (ultimo - primeiro)) - 1) << primeiro
+        return cls(modelo, mapas)
+
+    def _janelas(self, mapa, tamanho, cheio):
+        livre = ~mapa & cheio
+        janela = livre
+        for i in range(1, tamanho):
+            janela &= livre >> i
+        return janela
+
+    def inicios_livres(self, servico):
+        """Máscara dos horários em que algum box comporta o serviço inteiro"""
+        tamanho = horarios_do_servico(servico)
+        quantidade = self.modelo.quantidade
+        if tamanho > quantidade:
+            return 0
+        cheio = (1 << quantidade) - 1
+        # O serviço precisa terminar dentro da grade do dia
+        validos = cheio >> (tamanho - 1)
+        resultado = 0
+        for mapa in self.mapas:
+            resultado |= self._janelas(mapa, tamanho, cheio)
+        return resultado & validos
+
+    def livres(self, servico):
+        """Quantidade de horários de início disponíveis para o serviço"""
+        return bin(self.inicios_livres(servico)).count("1")
+
+    def disponiveis(self, servico):
+        """Horários ('HH:MM') em que o serviço pode começar"""
+        mascara = self.inicios_livres(servico)
+        horarios = self.modelo.horarios
+        return frozenset(horarios[i] for i in range(len(horarios)) if mascara >> i & 1)
+
+    def box_livre(self, hora, servico):
+        """Primeiro box que comporta o serviço começando em `hora` (ou None)"""
+        indice = (minutos(hora) - self.modelo.inicio_min) // INTERVALO_MIN
+        tamanho = horarios_do_servico(servico)
+        if indice < 0 or indice + tamanho > self.modelo.quantidade:
+            return None
+        trecho = ((1 << tamanho) - 1) << indice
+        for box, mapa in enumerate(self.mapas, start=1):
+            if not mapa & trecho:
+                return box
+        return None
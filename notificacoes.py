@@ -0,0 +1,103 @@
+"""Invalidação dos caches entre processos com LISTEN/NOTIFY do PostgreSQL.
+
+Gatilhos em agendamentos e no calendário (migração 10) publicam a data
+alterada; cada processo do servidor mantém uma conexão dedicada escutando
+esses canais e descarta só o que mudou, sem consultar o banco de tempos
+em tempos. Se a conexão cair, tudo é descartado ao reconectar, porque as
+notificações do intervalo se perderam.
+"""
+import logging
+import select
+import threading
+
+import psycopg2
+import streamlit as st
+
+from banco import obter_config, parametros_conexao
+from calendario import recarregar_calendario
+from disponibilidade import invalidar_data, invalidar_tudo
+from repositorio import obter_repositorio
+
+logger = logging.getLogger("capitalpneus.notificacoes")
+
+CANAL_AGENDAMENTOS = "agendamentos_alterados"
+CANAL_CALENDARIO = "calendario_alterado"
+
+
+def parametros_escuta():
+    """LISTEN não funciona através do PgBouncer em modo transação: usa o endpoint direto do Neon"""
+    parametros = parametros_conexao()
+    parametros['host'] = obter_config("NEON_HOST_DIRETO", parametros['host'].replace("-pooler.", "."))
+    return parametros
+
+
+class OuvinteInvalidacoes(threading.Thread):
+    """Thread que aplica as notificações recebidas aos caches deste processo"""
+
+    def __init__(self, parametros, espera_maxima=30):
+        super().__init__(name="ouvinte-invalidacoes", daemon=True)
+        self._parametros = parametros
+        self._espera_maxima = espera_maxima
+        self._parar = threading.Event()
+        self.conectado = threading.Event()
+        self.recebidas = 0
+        self.reconexoes = 0
+
+    def _aplicar(self, notificacao):
+        self.recebidas += 1
+        if notificacao.channel == CANAL_AGENDAMENTOS:
+            invalidar_data(notificacao.payload)
+        elif notificacao.channel == CANAL_CALENDARIO:
+            recarregar_calendario()
+
+    def _escutar(self):
+        conn = psycopg2.connect(**self._parametros)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CANAL_AGENDAMENTOS}; LISTEN {CANAL_CALENDARIO};")
+            # O que mudou antes de começar a escutar não vai chegar
+            invalidar_tudo()
+            self.conectado.set()
+            logger.info("Escutando alterações de agendamentos e calendário")
+
+            while not self._parar.is_set():
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._aplicar(conn.notifies.pop(0))
+        finally:
+            self.conectado.clear()
+            conn.close()
+
+    def run(self):
+        espera = 1
+        while not self._parar.is_set():
+            try:
+                self._escutar()
+            except Exception:
+                self.reconexoes += 1
+                logger.warning("Ouvinte de invalidações desconectado; nova tentativa em %ss", espera, exc_info=True)
+                self._parar.wait(espera)
+                espera = min(espera * 2, self._espera_maxima)
+            else:
+                espera = 1
+
+    def parar(self):
+        self._parar.set()
+
+
+@st.cache_resource
+def iniciar_ouvinte():
+    """Um ouvinte por processo; None no backend em memória ou com OUVIR_ALTERACOES desligado"""
+    from repositorio_postgres import RepositorioPostgres
+
+    if not isinstance(obter_repositorio(), RepositorioPostgres):
+        return None
+    if str(obter_config("OUVIR_ALTERACOES", "true")).lower() in ("0", "false", "nao", "não"):
+        return None
+
+    ouvinte = OuvinteInvalidacoes(parametros_escuta())
+    ouvinte.start()
+    return ouvinte
@@ -0,0 +1,335 @@
+"""Painel de administração: agendamentos, cancelamento, estatísticas, feriados e desempenho."""
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from agendamentos import (
+    CAMPOS_BUSCA, LIMITE_BUSCA_CANCELAR, buscar_agendamentos_confirmados, cancelar_agendamento,
+    exportar_agendamentos, listar_agendamentos_admin,
+)
+from banco import CATALOGO, em_paralelo, obter_disjuntor, obter_metricas, obter_preparo
+from calendario import listar_excecoes, remover_excecao, salvar_excecao
+from disponibilidade import obter_cache
+from estatisticas import carregar_painel, periodo_padrao
+from motor_horarios import SERVICOS
+from notificacoes import iniciar_ouvinte
+
+st.markdown("### 👨‍💼 Painel de Administração")
+
+senha_admin = st.text_input("Senha do admin:", type="password", key="admin_pass")
+
+if senha_admin == "admin123":
+    admin_tab = st.tabs(["📋 Agendamentos", "🗑️ Cancelar", "📊 Estatísticas", "📅 Feriados", "⏱️ Desempenho"])
+    
+    with admin_tab[0]:
+        st.markdown("### Agendamentos Confirmados")
+        
+        hoje = datetime.now().date()
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            periodo = st.date_input("Período", value=(hoje, hoje + timedelta(days=30)), key="admin_periodo")
+        with col2:
+            filtro_servico = st.selectbox("Serviço", ["Todos"] + SERVICOS, key="admin_servico")
+        with col3:
+            filtro_placa = st.text_input("Placa", placeholder="ABC", key="admin_placa")
+        
+        # Intervalo ainda incompleto enquanto o admin escolhe a segunda data
+        inicio, fim = (periodo[0], periodo[-1]) if isinstance(periodo, tuple) and periodo else (hoje, hoje)
+        filtros = (inicio, fim, filtro_servico, filtro_placa.strip().upper())
+        
+        # Pilha com a chave inicial de cada página visitada; filtro novo volta à primeira
+        if st.session_state.get('admin_filtros') != filtros:
+            st.session_state.admin_filtros = filtros
+            st.session_state.admin_paginas = [None]
+        paginas = st.session_state.admin_paginas
+        
+    with admin_tab[2]:
+        st.markdown("### Estatísticas")
+        
+        padrao_inicio, padrao_fim = periodo_padrao()
+        periodo_estat = st.date_input("Período", value=(padrao_inicio, padrao_fim), key="estat_periodo")
+        if isinstance(periodo_estat, tuple) and len(periodo_estat) == 2:
+            estat_inicio, estat_fim = periodo_estat
+        else:
+            estat_inicio, estat_fim = padrao_inicio, padrao_fim
+        
+    # As três leituras das abas não dependem umas das outras: saem juntas
+    (agendamentos, proxima, erro_lista), (painel, erro_painel), (excecoes, erro_excecoes) = em_paralelo(
+        "admin",
+        lambda: listar_agendamentos_admin(
+            inicio, fim,
+            servico=None if filtro_servico == "Todos" else filtro_servico,
+            placa=filtros[3] or None,
+            apos=paginas[-1],
+        ),
+        lambda: carregar_painel(estat_inicio, estat_fim),
+        listar_excecoes,
+    )
+    
+    with admin_tab[0]:
+        if erro_lista:
+            st.error(f"❌ Erro ao carregar agendamentos: {erro_lista}")
+        elif len(agendamentos):
+            st.dataframe(agendamentos, use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum agendamento encontrado")
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Anterior", disabled=len(paginas) == 1, key="admin_anterior"):
+                paginas.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Página {len(paginas)}")
+        with col3:
+            if st.button("Próxima ▶", disabled=proxima is None, key="admin_proxima"):
+                paginas.append(proxima)
+                st.rerun()
+        
+        def gerar_exportacao(excel):
+            # Só roda quando o admin clica; todas as páginas, não só a visível
+            arquivo, erro = exportar_agendamentos(
+                inicio, fim,
+                servico=None if filtro_servico == "Todos" else filtro_servico,
+                placa=filtros[3] or None,
+                excel=excel,
+            )
+            if erro:
+                raise RuntimeError(f"Erro ao exportar agendamentos: {erro}")
+            with arquivo:
+                return arquivo.read()
+        
+        nome_exportacao = f"agendamentos_{inicio:%Y%m%d}_{fim:%Y%m%d}"
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "⬇️ Exportar CSV",
+                lambda: gerar_exportacao(excel=False),
+                file_name=f"{nome_exportacao}.csv",
+                mime="text/csv",
+                on_click="ignore",
+                use_container_width=True,
+                key="admin_exportar_csv",
+            )
+        with col2:
+            st.download_button(
+                "⬇️ Exportar para Excel",
+                lambda: gerar_exportacao(excel=True),
+                file_name=f"{nome_exportacao}_excel.csv",
+                mime="text/csv",
+                on_click="ignore",
+                use_container_width=True,
+                key="admin_exportar_excel",
+            )
+    
+    with admin_tab[1]:
+        st.markdown("### Cancelar Agendamento")
+        
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            campo_busca = st.selectbox("Buscar por", CAMPOS_BUSCA, key="cancelar_campo")
+        with col2:
+            termo_busca = st.text_input("Termo", placeholder="Placa, nome, telefone ou DD/MM/AAAA", key="cancelar_termo")
+        
+        if termo_busca.strip():
+            agendamentos, erro_busca = buscar_agendamentos_confirmados(campo_busca, termo_busca)
+            
+            if erro_busca:
+                st.warning(f"⚠️ {erro_busca}")
+            elif agendamentos:
+                por_id = {a['id']: a for a in agendamentos}
+                agendamento_id = st.selectbox(
+                    "Selecione o agendamento para cancelar:",
+                    list(por_id),
+                    format_func=lambda i: (
+                        f"{por_id[i]['data_agendamento'].strftime('%d/%m/%Y')} às {por_id[i]['hora_agendamento'].strftime('%H:%M')}"
+                        f" — {por_id[i]['placa']} — {por_id[i]['nome']} ({por_id[i]['servico']})"
+                    ),
+                )
+                
+                if len(agendamentos) == LIMITE_BUSCA_CANCELAR:
+                    st.caption(f"Mostrando os {LIMITE_BUSCA_CANCELAR} mais recentes; refine a busca se não encontrar.")
+                
+                if st.button("❌ Cancelar Agendamento", type="secondary"):
+                    cancelado, erro_cancel = cancelar_agendamento(agendamento_id)
+                    
+                    if erro_cancel:
+                        st.error(f"❌ Erro ao cancelar: {erro_cancel}")
+                    elif cancelado:
+                        st.success("✅ Agendamento cancelado!")
+                        st.rerun()
+                    else:
+                        st.warning("⚠️ Este agendamento já não estava confirmado")
+            else:
+                st.info("Nenhum agendamento confirmado encontrado")
+        else:
+            st.info("Busque o agendamento por placa, nome do cliente, telefone ou data")
+    
+    with admin_tab[2]:
+        if erro_painel:
+            st.error(f"❌ Erro ao carregar estatísticas: {erro_painel}")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Total de Agendamentos", painel['total_confirmados'])
+            
+            with col2:
+                st.metric("Total de Usuários", painel['total_usuarios'])
+            
+            with col3:
+                st.metric("Agendamentos no Período", painel['agendamentos_periodo'],
+                          delta=f"-{painel['cancelados_periodo']} cancelados", delta_color="off")
+            
+            with col4:
+                st.metric("Ocupação no Período", f"{painel['ocupacao_periodo']:.1f}%")
+            
+            st.markdown("#### Ocupação diária")
+            st.line_chart(painel['ocupacao_diaria'])
+            
+            st.markdown("#### Serviços")
+            if len(painel['servicos']):
+                st.bar_chart(painel['servicos'])
+            else:
+                st.info("Nenhum agendamento no período")
+        
+        cache = obter_cache().estatisticas()
+        st.caption(
+            f"Cache de horários: {cache['acertos']} acertos, {cache['falhas']} falhas "
+            f"({cache['taxa_acerto']:.0%}), {cache['invalidacoes']} invalidações, "
+            f"{cache['datas_em_cache']} datas em cache, {cache['vencidos_servidos']} servidos vencidos (banco fora)"
+        )
+    
+    with admin_tab[3]:
+        st.markdown("### Feriados e Horários Especiais")
+        
+        if erro_excecoes:
+            st.error(f"❌ Erro ao carregar calendário: {erro_excecoes}")
+        elif excecoes:
+            for e in excecoes:
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    if e['abertura'] is None:
+                        st.markdown(f"**{e['data'].strftime('%d/%m/%Y')}** — {e['descricao']} (fechado)")
+                    else:
+                        st.markdown(f"**{e['data'].strftime('%d/%m/%Y')}** — {e['descricao']} ({e['abertura'].strftime('%H:%M')} às {e['fechamento'].strftime('%H:%M')})")
+                with col2:
+                    if st.button("Remover", key=f"remover_excecao_{e['data']}"):
+                        erro = remover_excecao(e['data'])
+                        if erro:
+                            st.error(f"❌ Erro ao remover: {erro}")
+                        else:
+                            st.rerun()
+        else:
+            st.info("Nenhum feriado cadastrado")
+        
+        st.markdown("#### ➕ Adicionar")
+        data_excecao = st.date_input("Data", min_value=datetime.now().date(), key="excecao_data")
+        descricao_excecao = st.text_input("Descrição *", placeholder="Feriado municipal", key="excecao_descricao")
+        fechado = st.checkbox("Fechado o dia todo", value=True, key="excecao_fechado")
+        
+        if not fechado:
+            col1, col2 = st.columns(2)
+            with col1:
+                abertura = st.time_input("Abertura", value=time(8, 0), key="excecao_abertura")
+            with col2:
+                fechamento = st.time_input("Fechamento", value=time(12, 0), key="excecao_fechamento")
+        else:
+            abertura = fechamento = None
+        
+        if st.button("Salvar", type="primary", key="excecao_salvar"):
+            if not descricao_excecao:
+                st.error("❌ Preencha a descrição!")
+            elif abertura and fechamento and abertura > fechamento:
+                st.error("❌ Abertura depois do fechamento!")
+            else:
+                erro = salvar_excecao(data_excecao, descricao_excecao, abertura, fechamento)
+                if erro:
+                    st.error(f"❌ Erro ao salvar: {erro}")
+                else:
+                    st.success("✅ Calendário atualizado!")
+                    st.rerun()
+    
+    with admin_tab[4]:
+        st.markdown("### Desempenho do Banco")
+        st.caption("Instruções SQL executadas por este processo do servidor, da que mais consumiu tempo para a que menos.")
+        
+        metricas = obter_metricas()
+        consultas = metricas.resumo()
+        
+        if consultas:
+            st.dataframe(
+                pd.DataFrame(consultas, columns=[
+                    'consulta', 'chamadas', 'erros', 'linhas_por_chamada',
+                    'p50_ms', 'p95_ms', 'p99_ms', 'aquisicao_media_ms', 'total_s',
+                ]),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'linhas_por_chamada': st.column_config.NumberColumn("linhas/chamada", format="%.1f"),
+                    'p50_ms': st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+                    'p95_ms': st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+                    'p99_ms': st.column_config.NumberColumn("p99 (ms)", format="%.1f"),
+                    'aquisicao_media_ms': st.column_config.NumberColumn("aquisição (ms)", format="%.1f"),
+                    'total_s': st.column_config.NumberColumn("total (s)", format="%.2f"),
+                },
+            )
+        else:
+            st.info("Nenhuma consulta registrada ainda")
+        
+        disjuntor = obter_disjuntor()
+        st.caption(
+            f"Disjuntor do banco: {disjuntor.estado}, {disjuntor.falhas_seguidas} falhas seguidas, "
+            f"{disjuntor.aberturas} aberturas, {disjuntor.recusadas} chamadas recusadas"
+        )
+        
+        preparo = obter_preparo()
+        st.caption(
+            f"Instruções preparadas: {'ligadas' if preparo.ativo else 'desligadas'} ({preparo.motivo}), "
+            f"{len(CATALOGO)} no catálogo, {preparo.preparos} preparos, {preparo.execucoes} execuções por nome"
+        )
+        
+        ouvinte = iniciar_ouvinte()
+        if ouvinte is not None:
+            st.caption(
+                f"Invalidação entre processos: {'conectada' if ouvinte.conectado.is_set() else '⚠️ desconectada'}, "
+                f"{ouvinte.recebidas} notificações, {ouvinte.reconexoes} reconexões"
+            )
+        
+        paralelos = metricas.paralelos()
+        if paralelos:
+            st.markdown("#### Leituras em paralelo")
+            st.dataframe(
+                pd.DataFrame(paralelos, columns=['grupo', 'execucoes', 'parede_media_ms', 'sequencial_media_ms', 'economia_s']),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'parede_media_ms': st.column_config.NumberColumn("em paralelo (ms)", format="%.1f"),
+                    'sequencial_media_ms': st.column_config.NumberColumn("em sequência (ms)", format="%.1f"),
+                    'economia_s': st.column_config.NumberColumn("economia total (s)", format="%.2f"),
+                },
+            )
+        
+        st.markdown(f"#### Consultas lentas (≥ {metricas.limite_lento * 1000:.0f} ms)")
+        if metricas.lentas:
+            for quando, duracao, consulta in reversed(metricas.lentas):
+                st.markdown(f"`{datetime.fromtimestamp(quando).strftime('%d/%m %H:%M:%S')}` **{duracao * 1000:.0f} ms** — `{consulta[:150]}`")
+        else:
+            st.info("Nenhuma consulta lenta")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "⬇️ Exportar (Prometheus)",
+                metricas.prometheus(),
+                file_name="capital_pneus_sql.prom",
+                mime="text/plain",
+                use_container_width=True,
+            )
+        with col2:
+            if st.button("🧹 Zerar métricas", use_container_width=True):
+                metricas.zerar()
+                st.rerun()
+else:
+    if senha_admin:
+        st.error("❌ Senha incorreta!")
@@ -0,0 +1,16 @@
+"""Dados da conta e encerramento da sessão."""
+import streamlit as st
+
+from sessao import encerrar_sessao, perfil_da_sessao
+
+st.markdown("### ⚙️ Configurações da Conta")
+
+perfil = perfil_da_sessao()
+st.markdown(f"**Email:** {perfil['email']}")
+if perfil.get('telefone'):
+    st.markdown(f"**Telefone:** {perfil['telefone']}")
+
+if st.button("🔒 Sair de Todos os Dispositivos"):
+    encerrar_sessao()
+    st.success("✅ Desconectado de todos os dispositivos!")
+    st.rerun()
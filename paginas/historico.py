@@ -0,0 +1,66 @@
+"""Histórico de serviços do usuário, paginado sob demanda."""
+from html import escape
+
+import streamlit as st
+
+from sessao import carregar_mais_historico, historico_da_sessao, invalidar_historico_da_sessao, pagina_recem_aberta
+
+
+def html_historico(agendamentos, agrupar_por):
+    """Cartões do histórico agrupados por ano ou veículo, como um único bloco HTML"""
+    grupos = {}
+    for a in agendamentos:
+        if agrupar_por == "Ano":
+            chave = str(a['data_agendamento'].year)
+        else:
+            chave = f"🚗 {a['placa']} - {a['modelo']}"
+        grupos.setdefault(chave, []).append(a)
+    
+    partes = []
+    for chave, itens in grupos.items():
+        partes.append(f"<h4>{escape(chave)} ({len(itens)})</h4>")
+        for a in itens:
+            status_icon = "✅" if a['status'] == 'confirmado' else "❌" if a['status'] == 'cancelado' else "⏳"
+            partes.append(f"""
+            <div class="historico-card">
+                <h4>{status_icon} {escape(a['placa'])} - {escape(a['modelo'])}</h4>
+                <p><strong>Serviço:</strong> {escape(a['servico'])}</p>
+                <p><strong>Data:</strong> {a['data_agendamento'].strftime('%d/%m/%Y')} às {a['hora_agendamento'].strftime('%H:%M')}</p>
+                <p><strong>Status:</strong> {escape(a['status'].upper())}</p>
+            </div>
+            """)
+    return "".join(partes)
+
+
+st.markdown("### 📋 Histórico de Serviços")
+
+# Cada visita relê a primeira página: o status pode ter mudado por fora
+# (cancelamento pelo admin). Reruns dentro da página usam a cópia da sessão
+if pagina_recem_aberta():
+    invalidar_historico_da_sessao()
+
+historico, erro_historico = historico_da_sessao()
+
+if erro_historico:
+    st.error(f"❌ Erro ao carregar histórico: {erro_historico}")
+elif historico['linhas']:
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        agrupar_por = st.radio("Agrupar por", ["Ano", "Veículo"], horizontal=True, key="historico_agrupar")
+    with col2:
+        if st.button("🔄 Atualizar", use_container_width=True):
+            invalidar_historico_da_sessao()
+            st.rerun()
+    
+    # Um único elemento para todo o histórico carregado
+    st.markdown(html_historico(historico['linhas'], agrupar_por), unsafe_allow_html=True)
+    
+    if historico['proxima'] is not None:
+        if st.button("⬇️ Carregar mais", use_container_width=True):
+            erro_mais = carregar_mais_historico()
+            if erro_mais:
+                st.error(f"❌ Erro ao carregar histórico: {erro_mais}")
+            else:
+                st.rerun()
+else:
+    st.info("Você não tem agendamentos registrados.")
@@ -0,0 +1,82 @@
+"""Login e cadastro; a única página disponível sem sessão."""
+import streamlit as st
+
+from sessao import iniciar_sessao
+from usuarios import buscar_usuario_por_email, cadastrar_usuario
+
+st.markdown('<div class="auth-container">', unsafe_allow_html=True)
+
+auth_tab = st.tabs(["Login", "Cadastro"])
+
+with auth_tab[0]:
+    st.markdown("### 🔐 Fazer Login")
+    
+    email = st.text_input("Email", key="login_email", placeholder="seu@email.com")
+    senha = st.text_input("Senha", type="password", key="login_senha", placeholder="••••••••")
+    
+    if st.button("Entrar", use_container_width=True, type="primary"):
+        if email and senha:
+            resultado, erro = buscar_usuario_por_email(email)
+            
+            if resultado:
+                iniciar_sessao(resultado[0])
+                st.success("✅ Login realizado com sucesso!")
+                st.rerun()
+            else:
+                st.error("❌ Email ou senha incorretos!")
+        else:
+            st.error("❌ Preencha email e senha!")
+    
+    st.divider()
+    st.markdown("**Ou continue com:**")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔵 Google", use_container_width=True):
+            st.info("🔗 Integração Google OAuth será implementada aqui")
+    
+    with col2:
+        if st.button("🍎 Apple", use_container_width=True):
+            st.info("🔗 Integração Apple Sign In será implementada aqui")
+
+with auth_tab[1]:
+    st.markdown("### 📝 Criar Conta")
+    
+    nome = st.text_input("Nome completo", key="reg_nome", placeholder="João Silva")
+    email = st.text_input("Email", key="reg_email", placeholder="seu@email.com")
+    telefone = st.text_input("Telefone", key="reg_telefone", placeholder="(67) 99999-9999")
+    senha = st.text_input("Senha", type="password", key="reg_senha", placeholder="••••••••")
+    senha_confirmacao = st.text_input("Confirmar senha", type="password", key="reg_senha_conf", placeholder="••••••••")
+    
+    if st.button("Criar Conta", use_container_width=True, type="primary"):
+        if all([nome, email, telefone, senha, senha_confirmacao]):
+            if senha != senha_confirmacao:
+                st.error("❌ Senhas não conferem!")
+            else:
+                resultado, erro = cadastrar_usuario(nome, email, telefone)
+                
+                if erro:
+                    if "unique constraint" in erro.lower():
+                        st.error("❌ Este email já está cadastrado!")
+                    else:
+                        st.error(f"❌ Erro ao cadastrar: {erro}")
+                elif resultado:
+                    iniciar_sessao({'id': resultado[0]['id'], 'nome': nome, 'email': email, 'telefone': telefone})
+                    st.success("✅ Conta criada com sucesso!")
+                    st.rerun()
+        else:
+            st.error("❌ Preencha todos os campos!")
+    
+    st.divider()
+    st.markdown("**Ou crie com:**")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔵 Google", use_container_width=True, key="reg_google"):
+            st.info("🔗 Integração Google OAuth será implementada aqui")
+    
+    with col2:
+        if st.button("🍎 Apple", use_container_width=True, key="reg_apple"):
+            st.info("🔗 Integração Apple Sign In será implementada aqui")
+
+st.markdown('</div>', unsafe_allow_html=True)
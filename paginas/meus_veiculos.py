@@ -0,0 +1,78 @@
+"""Veículos do usuário: cadastro um a um e importação da frota por CSV."""
+import pandas as pd
+import streamlit as st
+
+from sessao import invalidar_veiculos_da_sessao, veiculos_da_sessao
+from usuarios import adicionar_veiculo, importar_veiculos
+
+st.markdown("### 🚗 Meus Veículos")
+
+col1, col2 = st.columns([3, 1])
+
+with col2:
+    if st.button("➕ Adicionar Veículo", use_container_width=True):
+        st.session_state.adicionar_veiculo = True
+
+if st.session_state.get('adicionar_veiculo', False):
+    st.markdown('<div class="form-section">', unsafe_allow_html=True)
+    st.markdown("### ➕ Novo Veículo")
+    
+    placa = st.text_input("Placa *", max_chars=8, placeholder="ABC-1234", key="new_placa")
+    modelo = st.text_input("Modelo *", placeholder="Iveco Truck", key="new_modelo")
+    ano = st.number_input("Ano", min_value=2000, max_value=2025, step=1, value=2020, key="new_ano")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("Adicionar", use_container_width=True, type="primary"):
+            if placa and modelo:
+                _, erro = adicionar_veiculo(st.session_state.usuario_id, placa, modelo, ano)
+                
+                if erro:
+                    st.error(f"❌ Erro ao adicionar veículo: {erro}")
+                else:
+                    invalidar_veiculos_da_sessao()
+                    st.success("✅ Veículo adicionado!")
+                    st.session_state.adicionar_veiculo = False
+                    st.rerun()
+            else:
+                st.error("❌ Preencha placa e modelo!")
+    
+    with col2:
+        if st.button("Cancelar", use_container_width=True):
+            st.session_state.adicionar_veiculo = False
+            st.rerun()
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+with st.expander("📥 Importar frota (CSV)"):
+    st.caption("Cabeçalho `placa,modelo,ano` (ou separado por `;`, como sai do Excel); ano é opcional. Placas repetidas ou já cadastradas são puladas.")
+    arquivo_frota = st.file_uploader("Arquivo CSV", type=["csv"], key="importar_frota")
+    
+    if st.button("Importar", disabled=arquivo_frota is None, use_container_width=True, key="importar_frota_botao"):
+        resultado, erro = importar_veiculos(st.session_state.usuario_id, arquivo_frota)
+        
+        if erro:
+            st.error(f"❌ Erro ao importar: {erro}")
+        else:
+            if resultado['importados']:
+                invalidar_veiculos_da_sessao()
+            st.success(f"✅ {resultado['importados']} veículo(s) importado(s)")
+            if resultado['rejeitados']:
+                st.warning(f"⚠️ {len(resultado['rejeitados'])} linha(s) ignorada(s)")
+                st.dataframe(pd.DataFrame(resultado['rejeitados']), use_container_width=True, hide_index=True)
+
+st.markdown("---")
+
+veiculos, _ = veiculos_da_sessao()
+
+if veiculos:
+    for v in veiculos:
+        st.markdown(f"""
+        <div class="historico-card">
+            <h4>🚗 {v['placa']} - {v['modelo']}</h4>
+            <p>Ano: {v['ano']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+else:
+    st.info("Você não tem veículos cadastrados.")
@@ -0,0 +1,153 @@
+"""Escolha de veículo, serviço, data e horário, e a reserva."""
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from banco import em_paralelo, modo_degradado
+from calendario import DIAS_SEMANA
+from disponibilidade import HORARIO_OCUPADO, obter_ocupacao, ocupacoes_da_janela, reservar_horario, resumo_disponibilidade
+from motor_horarios import SERVICOS, duracao_servico
+from sessao import invalidar_historico_da_sessao, veiculos_da_sessao
+
+
+@st.fragment
+def seletor_horario(data_str, servico, chave):
+    """Horários livres da data num único widget; escolher um reexecuta só este trecho"""
+    ocupacao = obter_ocupacao(data_str)
+    
+    if ocupacao is None:
+        st.error("❌ Não foi possível consultar os horários agora. Tente novamente.")
+        return
+    if not ocupacao.modelo.horarios:
+        st.warning("⚠️ Não há horários disponíveis para esta data (domingo ou feriado)")
+        return
+    
+    disponiveis = ocupacao.disponiveis(servico)
+    livres = [h for h in ocupacao.modelo.horarios if h in disponiveis]
+    
+    st.markdown("#### Selecione um horário disponível:")
+    if not livres:
+        st.warning("⚠️ Todos os horários desta data já foram reservados")
+        return
+    
+    hora = st.pills("Horário", livres, key=chave, format_func=lambda h: f"⏰ {h}", label_visibility="collapsed")
+    st.caption(f"🟢 {len(livres)} livres | ⚫ {len(ocupacao.modelo.horarios) - len(livres)} reservados")
+    
+    if hora:
+        st.markdown(f'<div class="success-message">✅ Horário selecionado: <strong>{hora}</strong></div>', unsafe_allow_html=True)
+
+
+def confirmar_agendamento(veiculo_id, data_agendamento, servico, chave_horario):
+    """on_click do botão de confirmar: roda antes do rerun, então o seletor e
+    o resumo dos dias já são desenhados sem o horário que acabou de sair"""
+    hora_selecionada = st.session_state.get(chave_horario)
+    if not hora_selecionada:
+        st.session_state.resultado_reserva = ("erro", "❌ Selecione um horário!")
+        return
+
+    agendamento_id, erro_agendamento = reservar_horario(
+        st.session_state.usuario_id, veiculo_id, data_agendamento.strftime("%Y-%m-%d"), hora_selecionada, servico
+    )
+    if erro_agendamento == HORARIO_OCUPADO:
+        resultado = ("erro", f"❌ Desculpe! Horário {hora_selecionada} já foi agendado por outro cliente!")
+        st.session_state.reservas_na_sessao = st.session_state.get('reservas_na_sessao', 0) + 1
+    elif erro_agendamento:
+        resultado = ("erro", f"❌ Erro ao criar agendamento: {erro_agendamento}")
+    else:
+        resultado = ("sucesso", f"✅ Agendamento confirmado para {data_agendamento.strftime('%d/%m/%Y')} às {hora_selecionada}!")
+        st.session_state.reservas_na_sessao = st.session_state.get('reservas_na_sessao', 0) + 1
+        invalidar_historico_da_sessao()
+    st.session_state.resultado_reserva = resultado
+
+
+st.markdown('<div class="form-section">', unsafe_allow_html=True)
+st.markdown("### 🚗 Selecione um veículo")
+
+data_minima = datetime.now().date()
+data_maxima = data_minima + timedelta(days=30)
+
+# Veículos e ocupação da janela não dependem um do outro: uma ida ao banco só
+(veiculos, erro), _ = em_paralelo(
+    "novo agendamento", veiculos_da_sessao, lambda: ocupacoes_da_janela(data_minima, 30)
+)
+
+if veiculos:
+    opcoes_veiculo = [f"{v['placa']} - {v['modelo']} ({v['ano']})" for v in veiculos]
+    veiculo_selecionado = st.selectbox("Veículo *", opcoes_veiculo)
+    veiculo_id = veiculos[opcoes_veiculo.index(veiculo_selecionado)]['id']
+else:
+    st.warning("⚠️ Você não tem veículos cadastrados! Cadastre um em 'Meus Veículos'")
+    veiculo_id = None
+
+st.markdown('</div>', unsafe_allow_html=True)
+
+if veiculo_id:
+    # O serviço vem antes da data: a duração define quais horários cabem
+    st.markdown('<div class="form-section">', unsafe_allow_html=True)
+    st.markdown("### 📝 Tipo de Serviço")
+    servico = st.selectbox(
+        "Selecione o serviço *",
+        SERVICOS,
+        format_func=lambda s: f"{s} ({duracao_servico(s)} min)",
+        key="servico"
+    )
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="form-section">', unsafe_allow_html=True)
+    st.markdown("### 📅 Data e Horário")
+    
+    resumo = resumo_disponibilidade(data_minima, 30, servico)
+    
+    if resumo is not None:
+        # Só oferece dias com horário livre; lotados aparecem como aviso
+        dias_livres = {d['data']: d for d in resumo if d['livres'] > 0}
+        dias_lotados = [d['data'] for d in resumo if d['lotado']]
+        
+        if dias_lotados:
+            st.caption("🚫 Dias lotados: " + ", ".join(d.strftime("%d/%m") for d in dias_lotados))
+        
+        data_agendamento = st.selectbox(
+            "Selecione a data *",
+            list(dias_livres),
+            format_func=lambda d: f"{DIAS_SEMANA[d.weekday()]} {d.strftime('%d/%m/%Y')} — {dias_livres[d]['livres']} horários livres",
+            key="data_input"
+        )
+    else:
+        data_agendamento = st.date_input(
+            "Selecione a data *",
+            min_value=data_minima,
+            max_value=data_maxima,
+            key="data_input"
+        )
+    
+    if data_agendamento is None:
+        st.warning("⚠️ Não há horários disponíveis nos próximos 30 dias")
+        data_agendamento = data_minima
+    
+    data_str = data_agendamento.strftime("%Y-%m-%d")
+    
+    # A chave muda com a data, o serviço e a cada reserva: a escolha anterior não vaza
+    chave_horario = f"horario_{data_str}_{servico}_{st.session_state.get('reservas_na_sessao', 0)}"
+    seletor_horario(data_str, servico, chave_horario)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    degradado = modo_degradado()
+    if degradado:
+        st.info("ℹ️ Novos agendamentos estão suspensos enquanto o sistema se reconecta. Tente novamente em instantes.")
+    
+    st.button(
+        "✅ CONFIRMAR AGENDAMENTO", use_container_width=True, type="primary", disabled=degradado,
+        on_click=confirmar_agendamento, args=(veiculo_id, data_agendamento, servico, chave_horario),
+    )
+    
+    resultado_reserva = st.session_state.pop('resultado_reserva', None)
+    if resultado_reserva:
+        tipo, mensagem = resultado_reserva
+        if tipo == "sucesso":
+            st.success(mensagem)
+            st.balloons()
+        else:
+            st.error(mensagem)
@@ -0,0 +1,141 @@
+"""Camada de armazenamento: a interface dos dados e a escolha do backend.
+
+Os módulos de domínio (usuarios, agendamentos, disponibilidade, calendario,
+estatisticas) cuidam de validação, cache e invalidação; toda leitura e
+escrita passa por um Repositorio. CAPITAL_BACKEND escolhe a implementação:
+
+    postgres  (padrão) repositorio_postgres.RepositorioPostgres, o Neon
+    memoria   repositorio_memoria.RepositorioMemoria, dados no processo,
+              sem rede; para rodar offline e medir o caminho de renderização
+
+Como em banco.execute_query, os métodos devolvem (resultado, erro) em vez de
+levantar exceções.
+"""
+import streamlit as st
+
+from banco import obter_config
+
+BACKENDS = ("postgres", "memoria")
+
+# Regras da importação de veículos, iguais nos dois backends: placa no
+# padrão antigo (ABC1234) ou Mercosul (ABC1D23), já sem hífen e em maiúsculas
+PADRAO_PLACA = "^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$"
+ANO_MINIMO_VEICULO = 1950
+
+# Arquivo que não é UTF-8 nem cp1252 (o que o Excel em português salva)
+ARQUIVO_ILEGIVEL = "o arquivo não está em UTF-8 nem em Windows-1252; salve a planilha como \"CSV UTF-8\""
+
+
+class Repositorio:
+    """Interface comum aos backends"""
+
+    def preparar(self):
+        """Deixa o armazenamento pronto para uso; exceção se não estiver (schema atrasado)"""
+        raise NotImplementedError
+
+    # Usuários e veículos
+
+    def buscar_usuario_por_email(self, email):
+        """([{id, nome, email, telefone}] ou [], erro)"""
+        raise NotImplementedError
+
+    def cadastrar_usuario(self, nome, email, telefone):
+        """([{id}], erro); e-mail repetido devolve erro contendo 'unique constraint'"""
+        raise NotImplementedError
+
+    def listar_veiculos(self, usuario_id):
+        """([{id, placa, modelo, ano}], erro), mais recentes primeiro"""
+        raise NotImplementedError
+
+    def adicionar_veiculo(self, usuario_id, placa, modelo, ano):
+        """(None, erro)"""
+        raise NotImplementedError
+
+    def importar_veiculos(self, usuario_id, arquivo, colunas, separador):
+        """Cadastra os veículos válidos de um CSV (binário, com cabeçalho).
+
+        `colunas` é a ordem das colunas do arquivo, ('placa', 'modelo') ou
+        ('placa', 'modelo', 'ano'). Nada é gravado se houver erro.
+        Retorna ({importados, rejeitados: [{linha, placa, motivo}]}, erro).
+        """
+        raise NotImplementedError
+
+    # Agendamentos
+
+    def reservas_confirmadas(self, inicio, fim):
+        """({data: [(hora, box, duracao_min)]}, erro) dos confirmados entre inicio e fim"""
+        raise NotImplementedError
+
+    def reservar(self, usuario_id, veiculo_id, data, hora, servico, duracao, boxes):
+        """({id, box} ou None se nenhum box estava livre, erro), atomicamente.
+
+        No PostgreSQL grava também as mensagens de confirmação e lembrete na
+        caixa de saída (mensageiro.py); o backend em memória não as gera.
+        """
+        raise NotImplementedError
+
+    def cancelar_agendamento(self, agendamento_id):
+        """([{data_agendamento}] ou [] se não estava confirmado, erro)"""
+        raise NotImplementedError
+
+    def historico_usuario(self, usuario_id, apos, limite):
+        """(até `limite` linhas anteriores à chave `apos`, mais recentes primeiro, erro)"""
+        raise NotImplementedError
+
+    def listar_agendamentos_admin(self, inicio, fim, servico, placa, apos, limite):
+        """(DataFrame de até `limite` confirmados posteriores à chave `apos`, erro)"""
+        raise NotImplementedError
+
+    def exportar_agendamentos(self, inicio, fim, servico, placa, destino, separador):
+        """Escreve em `destino` (binário) o CSV dos confirmados do período; (linhas, erro)"""
+        raise NotImplementedError
+
+    def buscar_agendamentos_confirmados(self, campo, valor, limite):
+        """(lista, erro); `valor` já normalizado para o campo (ver agendamentos.py)"""
+        raise NotImplementedError
+
+    # Calendário
+
+    def carregar_calendario(self, desde=None):
+        """(({dia_semana: (abertura, fechamento)}, {data: (abertura, fechamento) | None}), erro)
+
+        Exceções a partir de `desde` (padrão: ontem, o que a agenda usa).
+        """
+        raise NotImplementedError
+
+    def listar_excecoes(self):
+        """([{data, abertura, fechamento, descricao}] de hoje em diante, erro)"""
+        raise NotImplementedError
+
+    def salvar_excecao(self, data, descricao, abertura, fechamento):
+        """erro ou None"""
+        raise NotImplementedError
+
+    def remover_excecao(self, data):
+        """erro ou None"""
+        raise NotImplementedError
+
+    # Estatísticas
+
+    def resumo_estatisticas(self, inicio, fim):
+        """([{usuarios, confirmados, data, servico, status, quantidade, minutos}], erro).
+
+        Uma linha por (data, serviço, status) do período; se não houver
+        nenhuma, uma única linha com data None carregando os totais.
+        """
+        raise NotImplementedError
+
+
+@st.cache_resource
+def obter_repositorio():
+    """Backend escolhido por CAPITAL_BACKEND, um por processo do servidor"""
+    backend = str(obter_config("CAPITAL_BACKEND", "postgres")).lower()
+    if backend == "postgres":
+        from repositorio_postgres import RepositorioPostgres
+
+        return RepositorioPostgres()
+    if backend == "memoria":
+        from repositorio_memoria import RepositorioMemoria
+
+        return RepositorioMemoria()
+    raise ValueError(f"CAPITAL_BACKEND desconhecido: {backend} (use {' ou '.join(BACKENDS)})")
@@ -0,0 +1,335 @@
+"""Backend em memória: os mesmos dados e regras do PostgreSQL, dentro do processo.
+
+Sem rede nem servidor, serve para rodar o app offline (CAPITAL_BACKEND=memoria)
+e para medir o caminho de renderização e o motor de horários isolados da
+latência do banco. Os dados somem quando o processo termina.
+"""
+import csv
+import datetime
+import io
+import re
+import threading
+
+import pandas as pd
+
+from calendario import EXPEDIENTE_PADRAO
+from motor_horarios import minutos
+from repositorio import ANO_MINIMO_VEICULO, ARQUIVO_ILEGIVEL, PADRAO_PLACA, Repositorio
+
+COLUNAS_ADMIN = [
+    'id', 'nome', 'telefone', 'placa', 'modelo',
+    'data_agendamento', 'hora_agendamento', 'servico', 'status',
+]
+
+COLUNAS_EXPORTACAO = ['id', 'data', 'hora', 'servico', 'box', 'duracao_min', 'nome', 'telefone', 'placa', 'modelo']
+
+
+def _hora(valor):
+    if isinstance(valor, str):
+        return datetime.time(int(valor[:2]), int(valor[3:5]))
+    return valor
+
+
+def _data(valor):
+    return datetime.date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _chave(agendamento):
+    return (agendamento['data_agendamento'], agendamento['hora_agendamento'], agendamento['id'])
+
+
+def _digitos(texto):
+    return "".join(c for c in texto or "" if c.isdigit())
+
+
+def _normalizar_placa(texto):
+    return re.sub(r"[^A-Za-z0-9]", "", texto or "").upper()
+
+
+def _motivo_rejeicao(placa, modelo, ano):
+    """Mesmas regras e mesma ordem do SQL_VALIDAR_IMPORTACAO do PostgreSQL"""
+    if not re.match(PADRAO_PLACA, placa):
+        return 'placa inválida'
+    if not modelo:
+        return 'modelo em branco'
+    if len(modelo) > 255:
+        return 'modelo com mais de 255 caracteres'
+    if ano and not (re.fullmatch(r"[0-9]{4}", ano) and ANO_MINIMO_VEICULO <= int(ano) <= datetime.date.today().year + 1):
+        return 'ano inválido'
+    return None
+
+
+class RepositorioMemoria(Repositorio):
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._usuarios = {}
+        self._emails = {}
+        self._veiculos = {}
+        self._agendamentos = {}
+        # Equivalentes aos índices por data e por usuário do PostgreSQL
+        self._por_data = {}
+        self._por_usuario = {}
+        self._expediente = {
+            dia: (_hora(abertura), _hora(fechamento)) for dia, (abertura, fechamento) in EXPEDIENTE_PADRAO.items()
+        }
+        self._excecoes = {}
+        self._sequencias = {'usuarios': 0, 'veiculos': 0, 'agendamentos': 0}
+
+    def _proximo_id(self, tabela):
+        self._sequencias[tabela] += 1
+        return self._sequencias[tabela]
+
+    def preparar(self):
+        pass
+
+    def buscar_usuario_por_email(self, email):
+        with self._trava:
+            usuario_id = self._emails.get(email)
+            if usuario_id is None:
+                return [], None
+            usuario = self._usuarios[usuario_id]
+            return [{k: usuario[k] for k in ('id', 'nome', 'email', 'telefone')}], None
+
+    def cadastrar_usuario(self, nome, email, telefone):
+        with self._trava:
+            if email in self._emails:
+                return None, 'duplicate key value violates unique constraint "usuarios_email_key"'
+            usuario_id = self._proximo_id('usuarios')
+            self._usuarios[usuario_id] = {
+                'id': usuario_id, 'nome': nome, 'email': email, 'telefone': telefone,
+                'provider': 'local', 'data_criacao': datetime.datetime.now(),
+            }
+            self._emails[email] = usuario_id
+            return [{'id': usuario_id}], None
+
+    def listar_veiculos(self, usuario_id):
+        with self._trava:
+            veiculos = [v for v in self._veiculos.values() if v['usuario_id'] == usuario_id]
+        veiculos.sort(key=lambda v: (v['data_criacao'], v['id']), reverse=True)
+        return [{k: v[k] for k in ('id', 'placa', 'modelo', 'ano')} for v in veiculos], None
+
+    def adicionar_veiculo(self, usuario_id, placa, modelo, ano):
+        with self._trava:
+            if usuario_id not in self._usuarios:
+                return None, 'insert or update on table "veiculos_usuario" violates foreign key constraint'
+            veiculo_id = self._proximo_id('veiculos')
+            self._veiculos[veiculo_id] = {
+                'id': veiculo_id, 'usuario_id': usuario_id, 'placa': placa, 'modelo': modelo, 'ano': ano,
+                'data_criacao': datetime.datetime.now(),
+            }
+        return None, None
+
+    def importar_veiculos(self, usuario_id, arquivo, colunas, separador):
+        # detach() no fim: o wrapper fecharia o arquivo de quem chamou
+        texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+        try:
+            linhas = list(csv.reader(texto, delimiter=separador))[1:]
+        except UnicodeDecodeError:
+            return None, ARQUIVO_ILEGIVEL
+        finally:
+            texto.detach()
+
+        validos, rejeitados, vistas = [], [], set()
+        with self._trava:
+            if usuario_id not in self._usuarios:
+                return None, 'insert or update on table "veiculos_usuario" violates foreign key constraint'
+            cadastradas = {
+                _normalizar_placa(v['placa']) for v in self._veiculos.values() if v['usuario_id'] == usuario_id
+            }
+            for numero, campos in enumerate(linhas, start=2):
+                if len(campos) != len(colunas):
+                    return None, (
+                        f"linha {numero}: esperadas {len(colunas)} colunas separadas pelo mesmo separador do cabeçalho"
+                    )
+                linha = dict(zip(colunas, campos))
+                placa = _normalizar_placa(linha['placa'])
+                modelo = linha['modelo'].strip()
+                ano = linha.get('ano', '').strip()
+                motivo = _motivo_rejeicao(placa, modelo, ano)
+                if motivo is None and placa in vistas:
+                    motivo = 'placa repetida no arquivo'
+                elif motivo is None and placa in cadastradas:
+                    motivo = 'placa já cadastrada'
+                vistas.add(placa)
+                if motivo:
+                    rejeitados.append({'linha': numero, 'placa': linha['placa'], 'motivo': motivo})
+                else:
+                    validos.append((placa, modelo, int(ano) if ano else None))
+
+            for placa, modelo, ano in validos:
+                veiculo_id = self._proximo_id('veiculos')
+                self._veiculos[veiculo_id] = {
+                    'id': veiculo_id, 'usuario_id': usuario_id, 'placa': placa, 'modelo': modelo, 'ano': ano,
+                    'data_criacao': datetime.datetime.now(),
+                }
+        return {'importados': len(validos), 'rejeitados': rejeitados}, None
+
+    def _confirmados_do_dia(self, data):
+        return (
+            a for a in map(self._agendamentos.get, self._por_data.get(data, ()))
+            if a['status'] == 'confirmado'
+        )
+
+    def reservas_confirmadas(self, inicio, fim):
+        inicio, fim = _data(inicio), _data(fim)
+        reservas = {}
+        with self._trava:
+            for data in self._por_data:
+                if inicio <= data <= fim:
+                    for a in self._confirmados_do_dia(data):
+                        reservas.setdefault(data, []).append((a['hora_agendamento'], a['box'], a['duracao_min']))
+        return reservas, None
+
+    def reservar(self, usuario_id, veiculo_id, data, hora, servico, duracao, boxes):
+        data, hora = _data(data), _hora(hora)
+        inicio = minutos(hora)
+        fim = inicio + duracao
+        with self._trava:
+            veiculo = self._veiculos.get(veiculo_id)
+            if usuario_id not in self._usuarios or veiculo is None:
+                return None, 'insert or update on table "agendamentos" violates foreign key constraint'
+
+            ocupados = set()
+            for a in self._confirmados_do_dia(data):
+                comeco = minutos(a['hora_agendamento'])
+                if comeco < fim and comeco + a['duracao_min'] > inicio:
+                    ocupados.add(a['box'])
+            box = next((b for b in range(1, boxes + 1) if b not in ocupados), None)
+            if box is None:
+                return None, None
+
+            agendamento_id = self._proximo_id('agendamentos')
+            self._agendamentos[agendamento_id] = {
+                'id': agendamento_id, 'usuario_id': usuario_id, 'veiculo_id': veiculo_id,
+                'data_agendamento': data, 'hora_agendamento': hora, 'servico': servico,
+                'status': 'confirmado', 'box': box, 'duracao_min': duracao,
+                'data_criacao': datetime.datetime.now(),
+            }
+            self._por_data.setdefault(data, []).append(agendamento_id)
+            self._por_usuario.setdefault(usuario_id, []).append(agendamento_id)
+        return {'id': agendamento_id, 'box': box}, None
+
+    def cancelar_agendamento(self, agendamento_id):
+        with self._trava:
+            agendamento = self._agendamentos.get(agendamento_id)
+            if agendamento is None or agendamento['status'] != 'confirmado':
+                return [], None
+            agendamento['status'] = 'cancelado'
+            return [{'data_agendamento': agendamento['data_agendamento']}], None
+
+    def _linha_completa(self, agendamento):
+        """O agendamento com os campos de usuário e veículo, como no JOIN"""
+        usuario = self._usuarios[agendamento['usuario_id']]
+        veiculo = self._veiculos[agendamento['veiculo_id']]
+        return dict(
+            agendamento,
+            nome=usuario['nome'], telefone=usuario['telefone'], placa=veiculo['placa'], modelo=veiculo['modelo'],
+        )
+
+    def historico_usuario(self, usuario_id, apos, limite):
+        with self._trava:
+            linhas = [self._linha_completa(self._agendamentos[i]) for i in self._por_usuario.get(usuario_id, ())]
+        if apos:
+            linhas = [a for a in linhas if _chave(a) < tuple(apos)]
+        linhas.sort(key=_chave, reverse=True)
+        campos = ('id', 'placa', 'modelo', 'servico', 'data_agendamento', 'hora_agendamento', 'status')
+        return [{k: a[k] for k in campos} for a in linhas[:limite]], None
+
+    def listar_agendamentos_admin(self, inicio, fim, servico, placa, apos, limite):
+        with self._trava:
+            linhas = [
+                self._linha_completa(a)
+                for data, ids in self._por_data.items() if inicio <= data <= fim
+                for a in map(self._agendamentos.get, ids) if a['status'] == 'confirmado'
+            ]
+        if servico:
+            linhas = [a for a in linhas if a['servico'] == servico]
+        if placa:
+            linhas = [a for a in linhas if a['placa'].upper().startswith(placa)]
+        if apos:
+            linhas = [a for a in linhas if _chave(a) > tuple(apos)]
+        linhas.sort(key=_chave)
+        return pd.DataFrame(linhas[:limite], columns=COLUNAS_ADMIN), None
+
+    def exportar_agendamentos(self, inicio, fim, servico, placa, destino, separador):
+        df, _ = self.listar_agendamentos_admin(inicio, fim, servico, placa, None, None)
+        texto = io.StringIO()
+        escritor = csv.writer(texto, delimiter=separador, lineterminator="\n")
+        escritor.writerow(COLUNAS_EXPORTACAO)
+        with self._trava:
+            for agendamento_id in df['id']:
+                a = self._linha_completa(self._agendamentos[agendamento_id])
+                escritor.writerow(
+                    [a['id'], a['data_agendamento'], a['hora_agendamento'], a['servico'], a['box'], a['duracao_min'],
+                     a['nome'], a['telefone'], a['placa'], a['modelo']]
+                )
+        destino.write(texto.getvalue().encode("utf-8"))
+        return len(df), None
+
+    def buscar_agendamentos_confirmados(self, campo, valor, limite):
+        if campo == "Placa":
+            casa = lambda a: a['placa'].upper().startswith(valor)
+        elif campo == "Nome":
+            valor = valor.casefold()
+            casa = lambda a: valor in a['nome'].casefold()
+        elif campo == "Telefone":
+            casa = lambda a: _digitos(a['telefone']).startswith(valor)
+        else:
+            casa = lambda a: a['data_agendamento'] == valor
+
+        with self._trava:
+            linhas = [
+                self._linha_completa(a) for a in self._agendamentos.values() if a['status'] == 'confirmado'
+            ]
+        linhas = sorted(filter(casa, linhas), key=_chave, reverse=True)
+        campos = ('id', 'data_agendamento', 'hora_agendamento', 'servico', 'nome', 'telefone', 'placa')
+        return [{k: a[k] for k in campos} for a in linhas[:limite]], None
+
+    def carregar_calendario(self, desde=None):
+        desde = _data(desde) if desde else datetime.date.today() - datetime.timedelta(days=1)
+        with self._trava:
+            excecoes = {
+                data: (e['abertura'], e['fechamento']) if e['abertura'] is not None else None
+                for data, e in self._excecoes.items() if data >= desde
+            }
+            return (dict(self._expediente), excecoes), None
+
+    def listar_excecoes(self):
+        hoje = datetime.date.today()
+        with self._trava:
+            return [dict(e, data=d) for d, e in sorted(self._excecoes.items()) if d >= hoje], None
+
+    def salvar_excecao(self, data, descricao, abertura, fechamento):
+        if (abertura is None) != (fechamento is None) or (abertura is not None and _hora(abertura) > _hora(fechamento)):
+            return 'new row for relation "calendario_excecoes" violates check constraint'
+        with self._trava:
+            self._excecoes[_data(data)] = {
+                'abertura': _hora(abertura), 'fechamento': _hora(fechamento), 'descricao': descricao,
+            }
+        return None
+
+    def remover_excecao(self, data):
+        with self._trava:
+            self._excecoes.pop(_data(data), None)
+        return None
+
+    def resumo_estatisticas(self, inicio, fim):
+        grupos = {}
+        with self._trava:
+            totais = {
+                'usuarios': len(self._usuarios),
+                'confirmados': sum(a['status'] == 'confirmado' for a in self._agendamentos.values()),
+            }
+            for data, ids in self._por_data.items():
+                if inicio <= data <= fim:
+                    for a in map(self._agendamentos.get, ids):
+                        grupo = grupos.setdefault((data, a['servico'], a['status']), [0, 0])
+                        grupo[0] += 1
+                        grupo[1] += a['duracao_min']
+
+        linhas = [
+            dict(totais, data=data, servico=servico, status=status, quantidade=quantidade, minutos=ocupados)
+            for (data, servico, status), (quantidade, ocupados) in grupos.items()
+        ]
+        return linhas or [dict(totais, data=None, servico=None, status=None, quantidade=None, minutos=None)], None
@@ -0,0 +1,438 @@
+"""Backend PostgreSQL (Neon): as consultas do app sobre banco.execute_query."""
+import datetime
+import re
+
+import psycopg2.errors
+
+from banco import consultar_dataframe, copiar_para_arquivo, declarar, execute_query, transacao
+from mensagens import canais_ativos, hora_lembrete
+from motor_horarios import formatar_minutos, minutos
+from repositorio import ANO_MINIMO_VEICULO, ARQUIVO_ILEGIVEL, PADRAO_PLACA, Repositorio
+
+# Campo de busca da aba Cancelar -> condição que usa um índice próprio
+CONDICOES_BUSCA = {
+    "Placa": "upper(v.placa) LIKE %s ESCAPE '\\'",
+    "Nome": "u.nome ILIKE %s ESCAPE '\\'",
+    "Telefone": "regexp_replace(u.telefone, '[^0-9]', '', 'g') LIKE %s ESCAPE '\\'",
+    "Data": "a.data_agendamento = %s",
+}
+
+
+# Reserva num mês sem partição: só se a manutenção parou e a partição
+# padrão (migração 13) não existe. Não mostrar o texto do driver ao cliente
+AGENDA_NAO_ABERTA = "A agenda dessa data ainda não está aberta. Escolha outra data ou fale com a loja."
+
+# Trava (pg_advisory_xact_lock de duas chaves) das importações de um usuário
+TRAVA_IMPORTACAO = 48_151_624
+
+# A tabela temporária some no COMMIT: não sobra nada na conexão devolvida
+# ao pool, e funciona atrás do pooler do Neon em modo transação
+SQL_PREPARAR_IMPORTACAO = """
+    CREATE TEMP TABLE importacao_veiculos (
+        linha BIGSERIAL,
+        placa TEXT,
+        modelo TEXT,
+        ano TEXT,
+        placa_normalizada TEXT,
+        motivo TEXT
+    ) ON COMMIT DROP
+"""
+
+# Texto livre na tabela temporária: placa, modelo ou ano ruins não param o
+# COPY, viram motivo de rejeição. Só o formato do CSV (número de colunas,
+# aspas) ainda aborta tudo, ver _erro_de_formato. Validação e de-duplicação
+# numa passada só, com as placas já cadastradas do usuário num hash join
+# em vez de uma busca por linha
+SQL_VALIDAR_IMPORTACAO = """
+    UPDATE importacao_veiculos i
+    SET placa_normalizada = n.placa,
+        motivo = CASE
+            WHEN n.placa !~ %(padrao)s THEN 'placa inválida'
+            WHEN n.modelo = '' THEN 'modelo em branco'
+            WHEN length(n.modelo) > 255 THEN 'modelo com mais de 255 caracteres'
+            WHEN n.ano !~ '^[0-9]{4}$' THEN 'ano inválido'
+            WHEN n.ano::int NOT BETWEEN %(ano_minimo)s AND %(ano_maximo)s THEN 'ano inválido'
+            WHEN n.ordem > 1 THEN 'placa repetida no arquivo'
+            WHEN n.ja_cadastrada THEN 'placa já cadastrada'
+        END
+    FROM (
+        SELECT
+            s.linha, s.placa, s.modelo, s.ano,
+            row_number() OVER (PARTITION BY s.placa ORDER BY s.linha) AS ordem,
+            e.placa IS NOT NULL AS ja_cadastrada
+        FROM (
+            SELECT
+                linha,
+                upper(regexp_replace(coalesce(placa, ''), '[^A-Za-z0-9]', '', 'g')) AS placa,
+                coalesce(trim(modelo), '') AS modelo,
+                nullif(trim(ano), '') AS ano
+            FROM importacao_veiculos
+        ) s
+        LEFT JOIN (
+            SELECT DISTINCT upper(regexp_replace(placa, '[^A-Za-z0-9]', '', 'g')) AS placa
+            FROM veiculos_usuario
+            WHERE usuario_id = %(usuario_id)s
+        ) e ON e.placa = s.placa
+    ) n
+    WHERE i.linha = n.linha
+"""
+
+SQL_GRAVAR_IMPORTACAO = """
+    INSERT INTO veiculos_usuario (usuario_id, placa, modelo, ano)
+    SELECT %s, placa_normalizada, trim(modelo), nullif(trim(ano), '')::int
+    FROM importacao_veiculos
+    WHERE motivo IS NULL
+    ORDER BY linha
+"""
+
+
+def _erro_de_formato(erro, colunas):
+    """Mensagem do COPY que abortou por uma linha fora do formato do CSV.
+
+    O CONTEXT do PostgreSQL traz "COPY importacao_veiculos, line N": N conta
+    o cabeçalho, como a numeração de linhas da planilha.
+    """
+    linha = re.search(r"line (\d+)", erro.diag.context or "")
+    onde = f"linha {linha.group(1)}" if linha else "arquivo"
+    if "unterminated" in (erro.diag.message_primary or ""):
+        # Aspas abertas engolem o resto do arquivo: N é onde ele acabou
+        return f"aspas sem fechamento até a {onde}"
+    return f"{onde}: esperadas {len(colunas)} colunas separadas pelo mesmo separador do cabeçalho"
+
+
+def _escapar_like(texto):
+    """O texto literal num padrão LIKE ... ESCAPE '\\': %, _ e \\ não são curingas"""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filtros_admin(inicio, fim, servico, placa):
+    """Condições e parâmetros comuns à lista e à exportação do admin"""
+    condicoes = ["a.status = 'confirmado'", "a.data_agendamento BETWEEN %(inicio)s AND %(fim)s"]
+    params = {'inicio': inicio, 'fim': fim}
+
+    if servico:
+        condicoes.append("a.servico = %(servico)s")
+        params['servico'] = servico
+    if placa:
+        condicoes.append("upper(v.placa) LIKE %(placa)s ESCAPE '\\'")
+        params['placa'] = _escapar_like(placa) + "%"
+    return condicoes, params
+
+
+class RepositorioPostgres(Repositorio):
+
+    def preparar(self):
+        from migracoes import verificar_schema
+
+        verificar_schema()
+
+    def buscar_usuario_por_email(self, email):
+        query = declarar("usuario_por_email", "SELECT id, nome, email, telefone FROM usuarios WHERE email = %s")
+        return execute_query(query, (email,), fetch=True)
+
+    def cadastrar_usuario(self, nome, email, telefone):
+        query = declarar(
+            "cadastrar_usuario",
+            "INSERT INTO usuarios (nome, email, telefone, provider) VALUES (%s, %s, %s, 'local') RETURNING id",
+        )
+        return execute_query(query, (nome, email, telefone), fetch=True, commit=True)
+
+    def listar_veiculos(self, usuario_id):
+        query = declarar(
+            "veiculos_do_usuario",
+            "SELECT id, placa, modelo, ano FROM veiculos_usuario WHERE usuario_id = %s ORDER BY data_criacao DESC",
+        )
+        return execute_query(query, (usuario_id,), fetch=True)
+
+    def adicionar_veiculo(self, usuario_id, placa, modelo, ano):
+        query = declarar(
+            "adicionar_veiculo", "INSERT INTO veiculos_usuario (usuario_id, placa, modelo, ano) VALUES (%s, %s, %s, %s)"
+        )
+        return execute_query(query, (usuario_id, placa, modelo, ano), fetch=False, commit=True)
+
+    def importar_veiculos(self, usuario_id, arquivo, colunas, separador):
+        params = {
+            'usuario_id': usuario_id,
+            'padrao': PADRAO_PLACA,
+            'ano_minimo': ANO_MINIMO_VEICULO,
+            'ano_maximo': datetime.date.today().year + 1,
+        }
+        try:
+            with transacao("importar veículos (COPY)") as cur:
+                # Duas importações do mesmo usuário ao mesmo tempo não duplicam placas
+                cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (TRAVA_IMPORTACAO, usuario_id))
+                cur.execute(SQL_PREPARAR_IMPORTACAO)
+                cur.copy_expert(
+                    f"COPY importacao_veiculos ({', '.join(colunas)}) FROM STDIN "
+                    f"WITH (FORMAT csv, HEADER true, DELIMITER '{separador}')",
+                    arquivo,
+                )
+                cur.execute(SQL_VALIDAR_IMPORTACAO, params)
+                cur.execute(SQL_GRAVAR_IMPORTACAO, (usuario_id,))
+                importados = cur.rowcount
+                # linha + 1: a numeração do arquivo conta o cabeçalho
+                cur.execute("""
+                    SELECT linha + 1 AS linha, placa, motivo
+                    FROM importacao_veiculos
+                    WHERE motivo IS NOT NULL
+                    ORDER BY linha
+                """)
+                rejeitados = cur.fetchall()
+        except psycopg2.errors.BadCopyFileFormat as e:
+            return None, _erro_de_formato(e, colunas)
+        except (psycopg2.errors.CharacterNotInRepertoire, psycopg2.errors.UntranslatableCharacter):
+            return None, ARQUIVO_ILEGIVEL
+        except Exception as e:
+            return None, str(e)
+        return {'importados': importados, 'rejeitados': rejeitados}, None
+
+    def reservas_confirmadas(self, inicio, fim):
+        if inicio == fim:
+            query = declarar("reservas_do_dia", """
+                SELECT data_agendamento, hora_agendamento, box, duracao_min
+                FROM agendamentos
+                WHERE data_agendamento = %s AND status = 'confirmado'
+            """)
+            params = (inicio,)
+        else:
+            query = declarar("reservas_do_periodo", """
+                SELECT data_agendamento, hora_agendamento, box, duracao_min
+                FROM agendamentos
+                WHERE data_agendamento BETWEEN %s AND %s AND status = 'confirmado'
+            """)
+            params = (inicio, fim)
+        resultado, erro = execute_query(query, params, fetch=True)
+
+        if erro:
+            return None, erro
+
+        reservas = {}
+        for row in resultado or []:
+            reservas.setdefault(row['data_agendamento'], []).append(
+                (row['hora_agendamento'], row['box'], row['duracao_min'])
+            )
+        return reservas, None
+
+    def reservar(self, usuario_id, veiculo_id, data, hora, servico, duracao, boxes):
+        # Uma única instrução: o primeiro box sem sobreposição; a restrição de
+        # exclusão decide corridas entre sessões. As mensagens de confirmação
+        # e lembrete entram na caixa de saída junto, ou nada é gravado
+        query = declarar("reservar", """
+            WITH novo AS (
+                INSERT INTO agendamentos
+                    (usuario_id, veiculo_id, data_agendamento, hora_agendamento, servico, status, box, duracao_min)
+                SELECT %(usuario_id)s, %(veiculo_id)s, %(data)s, %(hora)s, %(servico)s, 'confirmado', b.box, %(duracao)s
+                FROM generate_series(1, %(boxes)s) AS b(box)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM agendamentos a
+                    WHERE a.data_agendamento = %(data)s AND a.box = b.box AND a.status = 'confirmado'
+                      AND a.hora_agendamento < %(fim)s
+                      AND a.hora_agendamento + a.duracao_min * INTERVAL '1 minute' > %(hora)s
+                )
+                ORDER BY b.box
+                LIMIT 1
+                ON CONFLICT DO NOTHING
+                RETURNING id, box, usuario_id, veiculo_id, data_agendamento, hora_agendamento, servico
+            ), mensagens AS (
+                INSERT INTO mensagens_saida (chave, tipo, canal, destino, agendamento_id, enviar_em, dados)
+                SELECT m.tipo || ':' || c.canal || ':' || n.id, m.tipo, c.canal, d.destino, n.id, m.enviar_em,
+                       jsonb_build_object(
+                           'nome', u.nome, 'placa', v.placa, 'modelo', v.modelo, 'servico', n.servico,
+                           'data', n.data_agendamento, 'hora', n.hora_agendamento
+                       )
+                FROM novo n
+                JOIN usuarios u ON u.id = n.usuario_id
+                JOIN veiculos_usuario v ON v.id = n.veiculo_id
+                CROSS JOIN unnest(%(canais)s::text[]) AS c(canal)
+                CROSS JOIN LATERAL (
+                    SELECT NULLIF(CASE c.canal WHEN 'email' THEN u.email ELSE u.telefone END, '') AS destino
+                ) d
+                CROSS JOIN LATERAL (VALUES
+                    ('confirmacao', LOCALTIMESTAMP),
+                    ('lembrete', n.data_agendamento - 1 + %(hora_lembrete)s::time)
+                ) AS m(tipo, enviar_em)
+                -- Sem lembrete se o horário dele já passou (reserva para hoje ou amanhã)
+                WHERE d.destino IS NOT NULL AND (m.tipo = 'confirmacao' OR m.enviar_em > LOCALTIMESTAMP)
+            )
+            SELECT id, box FROM novo
+        """)
+        params = {
+            'usuario_id': usuario_id,
+            'veiculo_id': veiculo_id,
+            'data': data,
+            'hora': hora,
+            'servico': servico,
+            'duracao': duracao,
+            'boxes': boxes,
+            'fim': formatar_minutos(minutos(hora) + duracao),
+            'canais': canais_ativos(),
+            'hora_lembrete': hora_lembrete(),
+        }
+        resultado, erro = execute_query(query, params, fetch=True, commit=True)
+
+        if erro and "no partition of relation" in erro:
+            return None, AGENDA_NAO_ABERTA
+        if erro:
+            return None, erro
+        return (resultado[0] if resultado else None), None
+
+    def cancelar_agendamento(self, agendamento_id):
+        # Confirmação ou lembrete ainda não enviados não saem mais
+        query = declarar("cancelar_agendamento", """
+            WITH cancelado AS (
+                UPDATE agendamentos SET status = 'cancelado'
+                WHERE id = %(id)s AND status = 'confirmado'
+                RETURNING id, data_agendamento
+            ), descartadas AS (
+                UPDATE mensagens_saida m SET status = 'descartada'
+                FROM cancelado c
+                WHERE m.agendamento_id = c.id AND m.status = 'pendente'
+            )
+            SELECT data_agendamento FROM cancelado
+        """)
+        return execute_query(query, {'id': agendamento_id}, fetch=True, commit=True)
+
+    def historico_usuario(self, usuario_id, apos, limite):
+        nome, condicao_apos = "historico_usuario", ""
+        params = {'usuario_id': usuario_id, 'limite': limite}
+        if apos:
+            nome = "historico_usuario_apos"
+            condicao_apos = "AND (a.data_agendamento, a.hora_agendamento, a.id) < (%(apos_data)s, %(apos_hora)s, %(apos_id)s)"
+            params['apos_data'], params['apos_hora'], params['apos_id'] = apos
+
+        # Os meses arquivados continuam no histórico; cada lado percorre o
+        # próprio índice (usuario_id, data DESC, hora DESC, id DESC)
+        query = declarar(nome, f"""
+            SELECT
+                a.id, v.placa, v.modelo, a.servico, a.data_agendamento, a.hora_agendamento, a.status
+            FROM (
+                SELECT * FROM agendamentos
+                UNION ALL
+                SELECT * FROM agendamentos_arquivo
+            ) a
+            JOIN veiculos_usuario v ON a.veiculo_id = v.id
+            WHERE a.usuario_id = %(usuario_id)s {condicao_apos}
+            ORDER BY a.data_agendamento DESC, a.hora_agendamento DESC, a.id DESC
+            LIMIT %(limite)s
+        """)
+        return execute_query(query, params, fetch=True)
+
+    def listar_agendamentos_admin(self, inicio, fim, servico, placa, apos, limite):
+        condicoes, params = _filtros_admin(inicio, fim, servico, placa)
+        params['limite'] = limite
+        # Uma instrução do catálogo por combinação de filtros
+        nome = "admin_lista" + ("_servico" if servico else "") + ("_placa" if placa else "") + ("_apos" if apos else "")
+        if apos:
+            condicoes.append("(a.data_agendamento, a.hora_agendamento, a.id) > (%(apos_data)s, %(apos_hora)s, %(apos_id)s)")
+            params['apos_data'], params['apos_hora'], params['apos_id'] = apos
+
+        query = declarar(nome, f"""
+            SELECT
+                a.id, u.nome, u.telefone, v.placa, v.modelo,
+                a.data_agendamento, a.hora_agendamento, a.servico, a.status
+            FROM agendamentos a
+            JOIN usuarios u ON a.usuario_id = u.id
+            JOIN veiculos_usuario v ON a.veiculo_id = v.id
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY a.data_agendamento, a.hora_agendamento, a.id
+            LIMIT %(limite)s
+        """)
+        return consultar_dataframe(query, params)
+
+    def exportar_agendamentos(self, inicio, fim, servico, placa, destino, separador):
+        condicoes, params = _filtros_admin(inicio, fim, servico, placa)
+        query = f"""
+            SELECT
+                a.id, a.data_agendamento AS data, a.hora_agendamento AS hora, a.servico,
+                a.box, a.duracao_min, u.nome, u.telefone, v.placa, v.modelo
+            FROM agendamentos a
+            JOIN usuarios u ON a.usuario_id = u.id
+            JOIN veiculos_usuario v ON a.veiculo_id = v.id
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY a.data_agendamento, a.hora_agendamento, a.id
+        """
+        return copiar_para_arquivo(query, params, destino, separador)
+
+    def buscar_agendamentos_confirmados(self, campo, valor, limite):
+        if campo == "Nome":
+            valor = "%" + _escapar_like(valor) + "%"
+        elif campo in ("Placa", "Telefone"):
+            valor = _escapar_like(valor) + "%"
+
+        query = declarar(f"busca_confirmados_{campo.lower()}", f"""
+            SELECT a.id, a.data_agendamento, a.hora_agendamento, a.servico, u.nome, u.telefone, v.placa
+            FROM agendamentos a
+            JOIN usuarios u ON a.usuario_id = u.id
+            JOIN veiculos_usuario v ON a.veiculo_id = v.id
+            WHERE a.status = 'confirmado' AND {CONDICOES_BUSCA[campo]}
+            ORDER BY a.data_agendamento DESC, a.hora_agendamento DESC, a.id DESC
+            LIMIT %s
+        """)
+        resultado, erro = execute_query(query, (valor, limite), fetch=True)
+        return resultado or [], erro
+
+    def carregar_calendario(self, desde=None):
+        expediente, erro = execute_query(declarar(
+            "horario_funcionamento", "SELECT dia_semana, abertura, fechamento FROM horario_funcionamento"
+        ), fetch=True)
+        if erro:
+            return None, erro
+
+        excecoes, erro = execute_query(declarar(
+            "excecoes_desde",
+            "SELECT data, abertura, fechamento FROM calendario_excecoes WHERE data >= COALESCE(%s::date, CURRENT_DATE - 1)",
+        ), (desde,), fetch=True)
+        if erro:
+            return None, erro
+
+        return (
+            {
+                row['dia_semana']: (row['abertura'], row['fechamento'])
+                for row in expediente
+                if row['abertura'] is not None
+            },
+            {
+                row['data']: (row['abertura'], row['fechamento']) if row['abertura'] is not None else None
+                for row in excecoes
+            },
+        ), None
+
+    def listar_excecoes(self):
+        query = declarar("listar_excecoes", """
+            SELECT data, abertura, fechamento, descricao
+            FROM calendario_excecoes
+            WHERE data >= CURRENT_DATE
+            ORDER BY data
+        """)
+        return execute_query(query, fetch=True)
+
+    def salvar_excecao(self, data, descricao, abertura, fechamento):
+        query = declarar("salvar_excecao", """
+            INSERT INTO calendario_excecoes (data, abertura, fechamento, descricao)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (data) DO UPDATE
+            SET abertura = EXCLUDED.abertura, fechamento = EXCLUDED.fechamento, descricao = EXCLUDED.descricao
+        """)
+        _, erro = execute_query(query, (data, abertura, fechamento, descricao), fetch=False, commit=True)
+        return erro
+
+    def remover_excecao(self, data):
+        query = declarar("remover_excecao", "DELETE FROM calendario_excecoes WHERE data = %s")
+        _, erro = execute_query(query, (data,), fetch=False, commit=True)
+        return erro
+
+    def resumo_estatisticas(self, inicio, fim):
+        # Totais e resumo diário vêm das tabelas mantidas por gatilho
+        query = declarar("resumo_estatisticas", """
+            SELECT
+                t.usuarios, t.confirmados,
+                e.data, e.servico, e.status, e.quantidade, e.minutos
+            FROM (
+                SELECT
+                    COALESCE((SELECT valor FROM contadores WHERE nome = 'usuarios'), 0) AS usuarios,
+                    COALESCE((SELECT valor FROM contadores WHERE nome = 'agendamentos_confirmados'), 0) AS confirmados
+            ) t
+            LEFT JOIN estatisticas_diarias e
+                ON e.data BETWEEN %s AND %s AND e.quantidade > 0
+        """)
+        return execute_query(query, (inicio, fim), fetch=True)
@@ -0,0 +1,93 @@
+"""Estado da sessão do usuário logado: perfil, veículos e histórico carregados uma vez."""
+import streamlit as st
+
+from agendamentos import historico_usuario
+from usuarios import listar_veiculos
+
+
+def iniciar_sessao(usuario):
+    """usuario: dict com id, nome, email e telefone"""
+    st.session_state.usuario_id = usuario['id']
+    st.session_state.usuario_nome = usuario['nome']
+    st.session_state.usuario_email = usuario['email']
+    st.session_state.perfil = dict(usuario)
+    st.session_state.veiculos = None
+    st.session_state.historico = None
+
+
+def encerrar_sessao():
+    st.session_state.usuario_id = None
+    st.session_state.usuario_nome = None
+    st.session_state.usuario_email = None
+    st.session_state.perfil = None
+    st.session_state.veiculos = None
+    st.session_state.historico = None
+
+
+def registrar_pagina(url_path):
+    """Chamada pelo app a cada rerun, antes de rodar a página ativa"""
+    st.session_state.pagina_anterior = st.session_state.get('pagina_atual')
+    st.session_state.pagina_atual = url_path
+
+
+def pagina_recem_aberta():
+    """True no primeiro rerun de uma página aberta a partir de outra"""
+    return st.session_state.get('pagina_anterior') != st.session_state.get('pagina_atual')
+
+
+def perfil_da_sessao():
+    return st.session_state.get('perfil') or {
+        'id': st.session_state.usuario_id,
+        'nome': st.session_state.usuario_nome,
+        'email': st.session_state.usuario_email,
+        'telefone': None,
+    }
+
+
+def veiculos_da_sessao():
+    """Veículos do usuário logado; só consulta o banco na primeira vez da sessão"""
+    veiculos = st.session_state.get('veiculos')
+    if veiculos is None:
+        resultado, erro = listar_veiculos(st.session_state.usuario_id)
+        if erro:
+            return [], erro
+        veiculos = st.session_state.veiculos = [dict(v) for v in resultado]
+    return veiculos, None
+
+
+def invalidar_veiculos_da_sessao():
+    """Chamar depois de cadastrar um veículo"""
+    st.session_state.veiculos = None
+
+
+def historico_da_sessao():
+    """Histórico já carregado: {'linhas': [...], 'proxima': chave ou None}.
+
+    Se o banco falhar ao recarregar, continua valendo a cópia da sessão.
+    """
+    historico = st.session_state.get('historico')
+    if historico is None or st.session_state.get('historico_vencido'):
+        linhas, proxima, erro = historico_usuario(st.session_state.usuario_id)
+        if erro:
+            return (historico, None) if historico is not None else (None, erro)
+        historico = st.session_state.historico = {'linhas': [dict(l) for l in linhas], 'proxima': proxima}
+        st.session_state.historico_vencido = False
+    return historico, None
+
+
+def carregar_mais_historico():
+    """Acrescenta a próxima página ao histórico da sessão"""
+    historico = st.session_state.get('historico')
+    if not historico or historico['proxima'] is None:
+        return None
+    linhas, proxima, erro = historico_usuario(st.session_state.usuario_id, apos=historico['proxima'])
+    if erro:
+        return erro
+    historico['linhas'].extend(dict(l) for l in linhas)
+    historico['proxima'] = proxima
+    return None
+
+
+def invalidar_historico_da_sessao():
+    """Chamar depois de um novo agendamento do usuário; recarrega na próxima leitura"""
+    st.session_state.historico_vencido = True
@@ -0,0 +1,124 @@
+"""Disjuntor na frente do pool de conexões."""
+import psycopg2
+import psycopg2.errors
+import pytest
+
+import banco
+
+
+def test_falha_ao_criar_pool_abre_o_disjuntor(monkeypatch):
+    disjuntor = banco.Disjuntor(limite_falhas=3, espera=60)
+    monkeypatch.setattr(banco, "obter_disjuntor", lambda: disjuntor)
+
+    def pool_inacessivel():
+        # O que PoolConexoes faz com NEON_POOL_MIN >= 1 e o banco fora do ar
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(banco, "obter_pool", pool_inacessivel)
+
+    for _ in range(3):
+        with pytest.raises(psycopg2.OperationalError):
+            with banco.conexao():
+                pass
+
+    assert disjuntor.estado == banco.Disjuntor.ABERTO
+    assert disjuntor.falhas_seguidas == 3
+    # Aberto: a próxima chamada nem tenta criar o pool
+    with pytest.raises(banco.BancoIndisponivel):
+        with banco.conexao():
+            pass
+    assert disjuntor.recusadas == 1
+
+
+class TimeoutDeInstrucao(psycopg2.errors.QueryCanceled):
+    # Como chega do servidor; o pgcode de uma exceção criada à mão é None
+    pgcode = "57014"
+
+
+class PoolFalso:
+    """Entrega uma conexão que levanta `erro` ao executar"""
+
+    def __init__(self, erro):
+        self.erro = erro
+        self.obtidas = 0
+        self.descartadas = 0
+
+    def obter(self):
+        self.obtidas += 1
+        pool = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *_):
+                return False
+
+            def execute(self, *_):
+                raise pool.erro
+
+        class Conexao:
+            closed = 0
+
+            def cursor(self, **_):
+                return Cursor()
+
+        return Conexao()
+
+    def devolver(self, conn, descartar=False):
+        self.descartadas += descartar
+
+
+def _preparar(monkeypatch, erro):
+    disjuntor = banco.Disjuntor(limite_falhas=3, espera=60)
+    pool = PoolFalso(erro)
+    monkeypatch.setattr(banco, "obter_disjuntor", lambda: disjuntor)
+    monkeypatch.setattr(banco, "obter_pool", lambda: pool)
+    monkeypatch.setattr(banco, "_aguardar_nova_tentativa", lambda tentativa: None)
+    return disjuntor, pool
+
+
+def test_timeout_de_instrucao_nao_conta_contra_o_banco(monkeypatch):
+    disjuntor, pool = _preparar(monkeypatch, TimeoutDeInstrucao("canceling statement due to statement timeout"))
+
+    resultado, erro = banco.execute_query("SELECT pg_sleep(60)")
+
+    assert resultado is None and "statement timeout" in erro
+    # Sem repetir a leitura, sem descartar a conexão, disjuntor fechado
+    assert pool.obtidas == 1
+    assert pool.descartadas == 0
+    assert disjuntor.estado == banco.Disjuntor.FECHADO
+
+
+def test_conexao_perdida_repete_a_leitura_e_conta_contra_o_banco(monkeypatch):
+    disjuntor, pool = _preparar(monkeypatch, psycopg2.OperationalError("server closed the connection unexpectedly"))
+    monkeypatch.setenv("NEON_TENTATIVAS_LEITURA", "2")
+
+    resultado, erro = banco.execute_query("SELECT 1")
+
+    assert resultado is None and "server closed" in erro
+    assert pool.obtidas == 2
+    assert pool.descartadas == 2
+    assert disjuntor.falhas_seguidas == 2
+
+
+def test_pool_esgotado_nao_conta_contra_o_banco(monkeypatch):
+    disjuntor = banco.Disjuntor(limite_falhas=1, espera=0)
+    monkeypatch.setattr(banco, "obter_disjuntor", lambda: disjuntor)
+
+    class PoolCheio:
+        def obter(self):
+            raise banco.PoolEsgotado("Nenhuma conexão livre após 5s")
+
+    monkeypatch.setattr(banco, "obter_pool", lambda: PoolCheio())
+    disjuntor.falha()
+    assert disjuntor.estado == banco.Disjuntor.ABERTO
+
+    # espera=0: a chamada é o teste do meio-aberto, e o pool cheio não o decide
+    with pytest.raises(banco.PoolEsgotado):
+        with banco.conexao():
+            pass
+    assert disjuntor.estado == banco.Disjuntor.MEIO_ABERTO
+    assert disjuntor.aberturas == 1
+    # O próximo pedido pode fazer o teste
+    disjuntor.permitir()
@@ -0,0 +1,26 @@
+"""Leituras em paralelo (banco.em_paralelo)."""
+import threading
+
+import banco
+
+
+def test_consultas_nas_threads_do_executor_sao_capturadas():
+    threads = []
+
+    def consulta(sql):
+        def executar():
+            threads.append(threading.current_thread().name)
+            banco._registrar(sql, None)
+            return sql
+        return executar
+
+    with banco.capturar_consultas() as consultas:
+        resultados = banco.em_paralelo("teste", consulta("SELECT 1"), consulta("SELECT 2"), consulta("SELECT 3"))
+
+    assert resultados == ["SELECT 1", "SELECT 2", "SELECT 3"]
+    assert sorted(sql for sql, _ in consultas) == ["SELECT 1", "SELECT 2", "SELECT 3"]
+    assert any(nome.startswith("consulta") for nome in threads)
+
+    # Fora do capturar_consultas as threads do executor não guardam a lista
+    banco.em_paralelo("teste", consulta("SELECT 4"), consulta("SELECT 5"))
+    assert len(consultas) == 3
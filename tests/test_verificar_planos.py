@@ -0,0 +1,41 @@
+"""Regressão de planos (verificar_planos.py)."""
+import datetime
+
+import pytest
+
+import verificar_planos
+
+D = datetime.date
+
+
+def _varredura(relacao):
+    return {"Node Type": "Append", "Plans": [{"Node Type": "Seq Scan", "Relation Name": relacao}]}
+
+
+def test_seq_scan_so_passa_em_particao_vazia_ou_inteira_no_periodo():
+    particoes = {
+        "agendamentos_2026_10": (D(2026, 10, 1), D(2026, 10, 31)),
+        "agendamentos_2026_11": (D(2026, 11, 1), D(2026, 11, 17)),
+        "agendamentos_2026_12": None,
+    }
+    periodo = (D(2026, 10, 18), D(2026, 11, 17))
+
+    # Mês atual só em parte dentro do período: tinha de usar o índice
+    assert verificar_planos._varreduras_sequenciais(
+        _varredura("agendamentos_2026_10"), particoes, periodo
+    ) == ["agendamentos_2026_10"]
+    assert verificar_planos._varreduras_sequenciais(_varredura("agendamentos_2026_11"), particoes, periodo) == []
+    assert verificar_planos._varreduras_sequenciais(_varredura("agendamentos_2026_12"), particoes, None) == []
+    # Sem limite de datas, só a partição vazia escapa
+    assert verificar_planos._varreduras_sequenciais(
+        _varredura("agendamentos_2026_11"), particoes, None
+    ) == ["agendamentos_2026_11"]
+    assert verificar_planos._varreduras_sequenciais(_varredura("usuarios"), particoes, periodo) == ["usuarios"]
+
+
+@pytest.mark.skipif(
+    not verificar_planos._banco_local(),
+    reason="precisa de um PostgreSQL local vazio (NEON_HOST=localhost, NEON_DATABASE=...)",
+)
+def test_consultas_quentes_sem_seq_scan():
+    assert verificar_planos.main([]) == 0
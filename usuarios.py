@@ -0,0 +1,54 @@
+"""Consultas de usuários e veículos."""
+import io
+
+from repositorio import ARQUIVO_ILEGIVEL, obter_repositorio
+
+# Ordem das colunas no CSV de importação de frota; ano é opcional
+COLUNAS_IMPORTACAO = ("placa", "modelo", "ano")
+
+# Tentadas em ordem: o "CSV (separado por vírgulas)" do Excel em português
+# sai em cp1252, o "CSV UTF-8" sai com BOM
+CODIFICACOES_IMPORTACAO = ("utf-8-sig", "cp1252")
+
+
+def buscar_usuario_por_email(email):
+    return obter_repositorio().buscar_usuario_por_email(email)
+
+
+def cadastrar_usuario(nome, email, telefone):
+    return obter_repositorio().cadastrar_usuario(nome, email, telefone)
+
+
+def listar_veiculos(usuario_id):
+    """Veículos do usuário, mais recentes primeiro"""
+    return obter_repositorio().listar_veiculos(usuario_id)
+
+
+def adicionar_veiculo(usuario_id, placa, modelo, ano):
+    return obter_repositorio().adicionar_veiculo(usuario_id, placa, modelo, ano)
+
+
+def importar_veiculos(usuario_id, arquivo):
+    """Cadastra em lote os veículos de um CSV (separado por vírgula ou ponto e vírgula).
+
+    Linhas inválidas ou com placa repetida são puladas e voltam em
+    'rejeitados'; uma linha com número errado de colunas recusa o arquivo
+    todo, com o número dela no erro. Retorna ({importados, rejeitados}, erro).
+    """
+    conteudo = arquivo.read()
+    for codificacao in CODIFICACOES_IMPORTACAO:
+        try:
+            texto = conteudo.decode(codificacao)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        return None, ARQUIVO_ILEGIVEL
+    # Os backends recebem sempre UTF-8, sem BOM
+    arquivo = io.BytesIO(texto.encode("utf-8"))
+    cabecalho = texto.partition("\n")[0]
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    colunas = tuple(c.strip().lower() for c in cabecalho.strip().split(separador))
+    if colunas not in (COLUNAS_IMPORTACAO, COLUNAS_IMPORTACAO[:2]):
+        return None, f"Cabeçalho deve ser {separador.join(COLUNAS_IMPORTACAO)} (ano opcional)"
+    return obter_repositorio().importar_veiculos(usuario_id, arquivo, colunas, separador)
@@ -0,0 +1,239 @@
+"""Regressão de planos: nenhuma consulta quente pode cair em Seq Scan.
+
+Aplica as migrações num PostgreSQL local VAZIO, popula com um volume
+realista, executa os mesmos fluxos do app capturando cada instrução e
+roda EXPLAIN em todas. Sai com código 1 se alguma varrer sequencialmente
+uma das tabelas grandes.
+
+    NEON_HOST=localhost NEON_DATABASE=capital_planos NEON_SSLMODE=disable \\
+        python verificar_planos.py [--usuarios 20000] [--dias 1095] [--manter]
+
+Com as mesmas variáveis, `pytest tests/test_verificar_planos.py` roda o
+mesmo teste (e o pula sem um banco local).
+"""
+import argparse
+import datetime
+import sys
+
+from banco import capturar_consultas, conexao, execute_query, parametros_conexao
+
+TABELAS_GRANDES = ("usuarios", "veiculos_usuario", "agendamentos", "estatisticas_diarias")
+
+SQL_POPULAR = """
+    INSERT INTO usuarios (nome, email, telefone, provider)
+    SELECT 'Cliente ' || i, 'cliente' || i || '@exemplo.com',
+           '(67) 9' || lpad(i::text, 8, '0'), 'local'
+    FROM generate_series(1, %(usuarios)s) i;
+
+    INSERT INTO veiculos_usuario (usuario_id, placa, modelo, ano)
+    SELECT u.id,
+           chr(65 + (u.id + v) %% 26) || chr(65 + (u.id / 26) %% 26) || chr(65 + (u.id / 676) %% 26)
+               || lpad(((u.id * 3 + v) %% 10000)::text, 4, '0'),
+           'Modelo ' || v, 2000 + (u.id + v) %% 25
+    FROM usuarios u, generate_series(1, %(veiculos_por_usuario)s) v;
+
+    -- Partições para todo o histórico gerado
+    SELECT criar_particao_agendamentos(m::date)
+    FROM generate_series(
+        date_trunc('month', CURRENT_DATE - %(dias)s), date_trunc('month', CURRENT_DATE + 30), INTERVAL '1 month'
+    ) m;
+
+    -- Grade dia x horário x box, sem sobreposição, com uma fração ocupada
+    INSERT INTO agendamentos
+        (usuario_id, veiculo_id, data_agendamento, hora_agendamento, servico, status, box, duracao_min)
+    SELECT v.usuario_id, v.id, g.dia, g.hora,
+           (ARRAY['Troca de Pneus', 'Manutenção', 'Alinhamento', 'Balanceamento', 'Outro'])[1 + g.k %% 5],
+           CASE WHEN g.k %% 7 = 0 THEN 'cancelado' ELSE 'confirmado' END,
+           g.box, 20
+    FROM (
+        SELECT d::date AS dia, TIME '08:00' + n * INTERVAL '20 minutes' AS hora, b AS box,
+               row_number() OVER () AS k
+        FROM generate_series(CURRENT_DATE - %(dias)s, CURRENT_DATE + 30, INTERVAL '1 day') d,
+             generate_series(0, 28) n,
+             generate_series(1, %(boxes)s) b
+        WHERE extract(isodow FROM d) < 7 AND random() < %(fracao)s
+    ) g
+    JOIN veiculos_usuario v
+        ON v.id = (SELECT min(id) FROM veiculos_usuario) + (g.k * 7919) %% (SELECT count(*) FROM veiculos_usuario);
+
+    ANALYZE;
+"""
+
+SQL_LIMPAR = """
+    TRUNCATE agendamentos, agendamentos_arquivo, mensagens_saida, veiculos_usuario, usuarios, estatisticas_diarias RESTART IDENTITY CASCADE;
+    UPDATE contadores SET valor = 0;
+"""
+
+
+def _banco_local():
+    host = parametros_conexao()['host'] or ""
+    return host in ("localhost", "127.0.0.1", "::1") or host.startswith("/")
+
+
+def cenarios():
+    """(nome, função, período) com os mesmos caminhos de código usados pelo app.
+
+    Período é o intervalo de datas (inicio, fim) que a consulta lê, ou None
+    se ela não tem limite de datas.
+    """
+    from agendamentos import (
+        buscar_agendamentos_confirmados, cancelar_agendamento, historico_usuario, listar_agendamentos_admin,
+    )
+    from calendario import _calendario_do_banco, listar_excecoes
+    from disponibilidade import invalidar_tudo, obter_ocupacao, reservar_horario, resumo_disponibilidade
+    from estatisticas import carregar_painel, periodo_padrao
+    from usuarios import buscar_usuario_por_email, listar_veiculos
+
+    hoje = datetime.date.today()
+    amanha = hoje + datetime.timedelta(days=1)
+    alvo = execute_query("""
+        SELECT v.usuario_id, v.id AS veiculo_id, v.placa, u.email, u.nome, u.telefone
+        FROM veiculos_usuario v JOIN usuarios u ON u.id = v.usuario_id
+        ORDER BY v.id DESC LIMIT 1
+    """)[0][0]
+    confirmado = execute_query(
+        "SELECT id FROM agendamentos WHERE status = 'confirmado' AND data_agendamento > %s LIMIT 1", (hoje,)
+    )[0][0]['id']
+
+    def resumo():
+        invalidar_tudo()
+        resumo_disponibilidade(hoje, 30, "Outro")
+
+    def reserva():
+        reservar_horario(alvo['usuario_id'], alvo['veiculo_id'], amanha.isoformat(), "17:20", "Outro")
+
+    def calendario():
+        _calendario_do_banco.clear()
+        _calendario_do_banco()
+        listar_excecoes()
+
+    dia_seguinte = (amanha, amanha)
+    proximos_30 = (hoje, hoje + datetime.timedelta(days=30))
+    ultimo_ano = (hoje - datetime.timedelta(days=365), hoje)
+    return [
+        ("login", lambda: buscar_usuario_por_email(alvo['email']), None),
+        ("veículos do usuário", lambda: listar_veiculos(alvo['usuario_id']), None),
+        ("ocupação do dia", lambda: obter_ocupacao(amanha.isoformat(), usar_cache=False), dia_seguinte),
+        ("janela de 30 dias", resumo, proximos_30),
+        ("reserva", reserva, dia_seguinte),
+        ("histórico", lambda: historico_usuario(alvo['usuario_id']), None),
+        ("admin: lista", lambda: listar_agendamentos_admin(*proximos_30), proximos_30),
+        ("admin: lista por serviço", lambda: listar_agendamentos_admin(*proximos_30, servico="Alinhamento"), proximos_30),
+        ("admin: lista por placa", lambda: listar_agendamentos_admin(*ultimo_ano, placa=alvo['placa']), ultimo_ano),
+        ("cancelar: placa", lambda: buscar_agendamentos_confirmados("Placa", alvo['placa']), None),
+        ("cancelar: nome", lambda: buscar_agendamentos_confirmados("Nome", alvo['nome']), None),
+        ("cancelar: telefone", lambda: buscar_agendamentos_confirmados("Telefone", alvo['telefone']), None),
+        ("cancelar: data", lambda: buscar_agendamentos_confirmados("Data", amanha.strftime("%d/%m/%Y")), dia_seguinte),
+        ("cancelar", lambda: cancelar_agendamento(confirmado), None),
+        ("estatísticas", lambda: carregar_painel(*periodo_padrao()), periodo_padrao()),
+        ("calendário", calendario, None),
+    ]
+
+
+def _leitura_inteira(relacao, particoes, periodo):
+    """Partição de agendamentos vazia, ou com todas as linhas dentro do período
+    do cenário: a consulta lê a partição inteira e o índice não ajudaria"""
+    if relacao not in particoes:
+        return False
+    extensao = particoes[relacao]
+    if extensao is None:
+        return True
+    return periodo is not None and periodo[0] <= extensao[0] and extensao[1] <= periodo[1]
+
+
+def _varreduras_sequenciais(plano, particoes, periodo):
+    """Tabelas grandes lidas com Seq Scan em qualquer nó do plano.
+
+    As partições de agendamentos também contam, salvo _leitura_inteira;
+    quem decide são as datas das linhas, não a estimativa do planejador.
+    """
+    encontradas = []
+    pendentes = [plano]
+    while pendentes:
+        no = pendentes.pop()
+        relacao = no.get("Relation Name", "")
+        if no.get("Node Type") == "Seq Scan" and relacao.startswith(TABELAS_GRANDES):
+            if not _leitura_inteira(relacao, particoes, periodo):
+                encontradas.append(relacao)
+        pendentes.extend(no.get("Plans", []))
+    return encontradas
+
+
+def explicar(cur, query, params):
+    cur.execute(b"EXPLAIN (FORMAT JSON) " + cur.mogrify(query, params))
+    return cur.fetchone()[0][0]["Plan"]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--veiculos-por-usuario", type=int, default=2)
+    parser.add_argument("--dias", type=int, default=3 * 365, help="dias de histórico de agendamentos")
+    parser.add_argument("--boxes", type=int, default=4)
+    parser.add_argument("--fracao", type=float, default=0.5, help="fração da grade ocupada")
+    parser.add_argument("--manter", action="store_true", help="não apaga os dados gerados")
+    args = parser.parse_args(argv)
+
+    if not _banco_local():
+        print("Recusado: verificar_planos.py só roda contra um PostgreSQL local (NEON_HOST)")
+        return 2
+
+    from migracoes import aplicar_migracoes
+
+    aplicar_migracoes()
+    existentes, erro = execute_query("SELECT EXISTS (SELECT 1 FROM usuarios) AS tem")
+    if erro or existentes[0]['tem']:
+        print("Recusado: o banco precisa estar vazio" + (f" ({erro})" if erro else ""))
+        return 2
+
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_POPULAR, {
+                'usuarios': args.usuarios,
+                'veiculos_por_usuario': args.veiculos_por_usuario,
+                'dias': args.dias,
+                'boxes': args.boxes,
+                'fracao': args.fracao,
+            })
+
+    # Partição -> (primeira, última data) das linhas dela; None se vazia
+    todas, _ = execute_query("""
+        SELECT c.relname
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent IN ('agendamentos'::regclass, 'agendamentos_arquivo'::regclass)
+    """)
+    extensoes, _ = execute_query("""
+        SELECT tableoid::regclass::text AS relname, min(data_agendamento) AS primeira, max(data_agendamento) AS ultima
+        FROM (SELECT tableoid, data_agendamento FROM agendamentos
+              UNION ALL
+              SELECT tableoid, data_agendamento FROM agendamentos_arquivo) a
+        GROUP BY tableoid
+    """)
+    particoes = {row['relname']: None for row in todas or []}
+    particoes.update({row['relname']: (row['primeira'], row['ultima']) for row in extensoes or []})
+
+    falhas = 0
+    try:
+        for nome, executar, periodo in cenarios():
+            with capturar_consultas() as consultas:
+                executar()
+            with conexao() as conn:
+                with conn.cursor() as cur:
+                    varreduras = [
+                        t for q, p in consultas
+                        for t in _varreduras_sequenciais(explicar(cur, q, p), particoes, periodo)
+                    ]
+            if varreduras:
+                falhas += 1
+                print(f"FALHA {nome}: Seq Scan em {', '.join(sorted(set(varreduras)))}")
+            else:
+                print(f"OK    {nome} ({len(consultas)} consulta(s))")
+    finally:
+        if not args.manter:
+            execute_query(SQL_LIMPAR, fetch=False, commit=True)
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))